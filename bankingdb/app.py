@@ -1,12 +1,15 @@
-from flask import Flask
+from flask import Flask, request
 from routes import routes_blueprint
-from database import init_db
+from database import init_db, close_db, backfill_transaction_totals
 from flask_jwt_extended import JWTManager
 from flasgger import Swagger
 from datetime import timedelta
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+from routes.utils import ojsonify, ORJSONProvider
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 app.config['JWT_SECRET_KEY'] = 'super_secret_key'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
@@ -33,12 +36,40 @@ Swagger(app, template={
     "security": [{"BearerAuth": []}],
 })
 
-# Initialize the database
-init_db()
-
 # Register blueprints
 app.register_blueprint(routes_blueprint)
 
+# Close the per-request database connection
+app.teardown_appcontext(close_db)
+
+# Routes raise werkzeug exceptions (BadRequest, NotFound, ...) instead of
+# building error responses themselves; render them all as {"error": ...}
+@app.errorhandler(HTTPException)
+def handle_http_exception(e):
+    return ojsonify({"error": e.description}, e.code)
+
+@app.errorhandler(Exception)
+def handle_exception(e):
+    app.logger.exception("Unhandled exception on %s %s", request.method, request.path)
+    return ojsonify({"error": str(e)}, 500)
+
+# Schema changes run once per deploy, before the workers start, rather than
+# in every process that imports the app:
+#   flask --app app init-db
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the tables, triggers and stored procedures."""
+    init_db()
+
+# One-off: fill customer_transaction_totals for transactions recorded before
+# its triggers existed
+#   flask --app app backfill-transaction-totals
+@app.cli.command('backfill-transaction-totals')
+def backfill_transaction_totals_command():
+    """Rebuild customer_transaction_totals from the transaction table."""
+    backfill_transaction_totals()
+
 if __name__ == '__main__':
+    init_db()
     app.run(debug=True)
 
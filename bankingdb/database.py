@@ -1,4 +1,10 @@
-import pymysql.cursors
+import MySQLdb
+import MySQLdb.cursors
+import threading
+from contextlib import contextmanager
+from dbutils.pooled_db import PooledDB
+from flask import g
+from MySQLdb.constants import CLIENT
 
 # MySQL database configuration
 DB_CONFIG = {
@@ -7,11 +13,102 @@ DB_CONFIG = {
     'password': 'farukrizaoz',   # Replace with your MySQL password
     'database': 'bank',   # Replace with your database name
     'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
+    # Rows are built as dicts by the driver, so results serialize directly
+    'cursorclass': MySQLdb.cursors.DictCursor,
+    # Send bytes parameters (the BINARY(16) IDs) as _binary literals so the
+    # server does not check them against the connection character set
+    'binary_prefix': True,
+    # Statements run inside a transaction until db_cursor(commit=True) or an
+    # explicit commit() ends it, so multi-statement handlers pay one commit
+    'autocommit': False,
+    # Report matched rather than changed rows from UPDATE, so rowcount alone
+    # tells whether the row exists even when the new values equal the old ones
+    'client_flag': CLIENT.FOUND_ROWS,
+    # Strict mode makes an invalid ENUM or out-of-range value an error (which
+    # the routes report as 400) instead of a warning and a silently stored ''.
+    # Fail fast instead of pinning a connection: SELECTs are aborted after 5s
+    # and row-lock waits give up after 10s. Slow reports can raise the limit
+    # per statement with the /*+ MAX_EXECUTION_TIME(ms) */ optimizer hint.
+    'init_command': (
+        "SET SESSION sql_mode = CONCAT_WS(',', NULLIF(@@SESSION.sql_mode, ''), 'STRICT_TRANS_TABLES'), "
+        "max_execution_time = 5000, innodb_lock_wait_timeout = 10"
+    )
 }
 
+# Server-side settings the write endpoints are tuned for (my.cnf, [mysqld]).
+# Commits stay fully durable, but concurrent commits wait up to 500us to share
+# one binlog fsync, or less once 8 are queued:
+#   innodb_flush_log_at_trx_commit = 1
+#   sync_binlog = 1
+#   binlog_group_commit_sync_delay = 500
+#   binlog_group_commit_sync_no_delay_count = 8
+
+# Connection pool sizes: connections kept open while idle, and the most that
+# may be checked out at once (further requests wait for one to be returned)
+POOL_MIN_CACHED = 5
+POOL_MAX_CONNECTIONS = 20
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Created on first use so importing this module never touches the database
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PooledDB(
+                    creator=MySQLdb,
+                    mincached=POOL_MIN_CACHED,
+                    maxconnections=POOL_MAX_CONNECTIONS,
+                    blocking=True,
+                    ping=1,
+                    **DB_CONFIG
+                )
+    return _pool
+
+# Borrow a connection from the pool; close() hands it back instead of
+# disconnecting, so existing call sites keep working unchanged
 def get_db_connection():
-    return pymysql.connect(**DB_CONFIG)
+    return get_pool().connection()
+
+# Connection for the current request, opened on first use and reused by
+# every later query in the same request
+def get_db():
+    if 'db' not in g:
+        g.db = get_db_connection()
+    return g.db
+
+# Registered with app.teardown_appcontext to close the request's connection
+def close_db(exc=None):
+    connection = g.pop('db', None)
+    if connection is not None:
+        connection.close()
+
+# Cursor on the request's connection. With commit=True the work is committed
+# when the block exits cleanly; any exception rolls it back before propagating.
+@contextmanager
+def db_cursor(commit=False):
+    connection = get_db()
+    try:
+        with connection.cursor() as cursor:
+            yield cursor
+        if commit:
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+# The route modules build their SQL as module constants at import. MySQLdb
+# has no server-side prepared statements, so that is what saves the
+# per-request string formatting. INSERTs meant for executemany keep bare %s
+# placeholders in VALUES, which lets MySQLdb batch the rows into multi-row
+# INSERT statements instead of sending one statement per row.
+
+# Unbuffered cursor on the request's connection: rows stay on the server
+# until they are fetched
+def get_streaming_cursor():
+    return get_db().cursor(MySQLdb.cursors.SSDictCursor)
 
 def init_db():
     connection = get_db_connection()
@@ -32,7 +129,7 @@ def init_db():
         );''')
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS user (
-            user_id CHAR(36) PRIMARY KEY,
+            user_id BINARY(16) PRIMARY KEY,
             username VARCHAR(100) UNIQUE NOT NULL,
             password VARCHAR(255) NOT NULL,
             role ENUM('ADMIN', 'USER') NOT NULL DEFAULT 'USER',
@@ -63,14 +160,14 @@ def init_db():
         );''')
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS loan (
-            loan_id CHAR(36) PRIMARY KEY,
+            loan_id BINARY(16) PRIMARY KEY,
             customer_id CHAR(36) NOT NULL,
             loan_type ENUM('HOME', 'AUTO', 'PERSONAL') NOT NULL,
             principal_amount DECIMAL(15, 2) NOT NULL,
             interest_rate DECIMAL(5, 2) NOT NULL,
             start_date DATE NOT NULL,
             end_date DATE NOT NULL,
-            status ENUM('ACTIVE', 'PAID_OFF', 'DEFAULT') NOT NULL,
+            status ENUM('ACTIVE', 'PAID_OFF', 'DEFAULT') NOT NULL DEFAULT 'ACTIVE',
             FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON UPDATE CASCADE ON DELETE RESTRICT,
             CONSTRAINT check_principal_positive CHECK (principal_amount > 0),
             CONSTRAINT check_interest_non_negative CHECK (interest_rate >= 0),
@@ -78,18 +175,19 @@ def init_db():
         );''')
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS loan_payment (
-            loan_payment_id CHAR(36) PRIMARY KEY,
-            loan_id CHAR(36) NOT NULL,
+            loan_payment_id BINARY(16) PRIMARY KEY,
+            loan_id BINARY(16) NOT NULL,
             payment_date DATETIME NOT NULL,
             payment_amount DECIMAL(15, 2) NOT NULL,
             remaining_balance DECIMAL(15, 2),
+            INDEX ix_loan_payment_loan_id_date (loan_id, payment_date DESC),
             FOREIGN KEY (loan_id) REFERENCES loan(loan_id) ON UPDATE CASCADE ON DELETE RESTRICT,
             CONSTRAINT check_payment_positive CHECK (payment_amount > 0),
             CONSTRAINT check_remaining_non_negative CHECK (remaining_balance >= 0)
         );''')
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS employee ( 
-            employee_id CHAR(36) PRIMARY KEY,
+            employee_id BINARY(16) PRIMARY KEY,
             branch_id CHAR(36) NOT NULL,
             first_name VARCHAR(100) NOT NULL,
             last_name VARCHAR(100) NOT NULL,
@@ -110,27 +208,35 @@ def init_db():
             status ENUM('ACTIVE', 'BLOCKED', 'EXPIRED') NOT NULL,
             FOREIGN KEY (account_id) REFERENCES account(account_id) ON UPDATE CASCADE ON DELETE RESTRICT
         );''')
+        # Tables created before transaction_timestamp got its default need:
+        #   ALTER TABLE transaction MODIFY transaction_timestamp
+        #       DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6);
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS transaction (
-            transaction_id CHAR(36) PRIMARY KEY,
+            transaction_id BINARY(16) PRIMARY KEY,
             from_account_id CHAR(36) NOT NULL,
             to_account_id CHAR(36),
             transaction_type ENUM('DEPOSIT', 'WITHDRAWAL', 'TRANSFER') NOT NULL,
             amount DECIMAL(15, 2) NOT NULL,
-            transaction_timestamp DATETIME NOT NULL,
+            transaction_timestamp DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX ix_tx_from (from_account_id, transaction_timestamp),
+            INDEX ix_tx_to (to_account_id, transaction_timestamp),
+            INDEX ix_tx_timestamp (transaction_timestamp),
             FOREIGN KEY (from_account_id) REFERENCES account(account_id) ON UPDATE CASCADE ON DELETE RESTRICT,
             FOREIGN KEY (to_account_id) REFERENCES account(account_id) ON UPDATE CASCADE ON DELETE SET NULL,
             CONSTRAINT check_amount_positive CHECK (amount > 0)
         );''')
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS customer_support (
-            ticket_id CHAR(36) PRIMARY KEY,
+            ticket_id BINARY(16) PRIMARY KEY,
             customer_id CHAR(36) NOT NULL,
-            employee_id CHAR(36) NOT NULL,
+            employee_id BINARY(16) NOT NULL,
             issue_description TEXT NOT NULL,
             status ENUM('OPEN', 'IN_PROGRESS', 'RESOLVED') NOT NULL,
-            created_date DATETIME NOT NULL,
+            created_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
             resolved_date DATETIME,
+            INDEX idx_customer_support_created (created_date, ticket_id),
+            INDEX idx_customer_support_status_employee (status, employee_id),
             FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON UPDATE CASCADE ON DELETE RESTRICT,
             FOREIGN KEY (employee_id) REFERENCES employee(employee_id) ON UPDATE CASCADE ON DELETE RESTRICT
         );''')
@@ -143,5 +249,157 @@ def init_db():
             computed_by_system BOOLEAN,
             FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON UPDATE CASCADE ON DELETE RESTRICT
         );''')
+        # Responses to write requests sent with an Idempotency-Key header, so a
+        # retried request is answered from here instead of being applied twice.
+        # scope separates endpoints (and users); rows are purged after a day.
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_key (
+            scope VARCHAR(64) NOT NULL,
+            idempotency_key VARCHAR(255) NOT NULL,
+            status_code SMALLINT NOT NULL,
+            response_body BLOB NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (scope, idempotency_key),
+            INDEX ix_idempotency_key_created (created_at)
+        );''')
+        # Running total of transaction amounts per customer, kept current by
+        # the triggers below so /high_transactions reads it instead of
+        # aggregating the transaction table. A transaction counts once for
+        # the sender's customer and once for the receiver's (once in total
+        # for a transfer to the same account).
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customer_transaction_totals (
+            customer_id CHAR(36) PRIMARY KEY,
+            total DECIMAL(20, 2) NOT NULL DEFAULT 0,
+            INDEX ix_customer_transaction_totals_total (total),
+            FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON UPDATE CASCADE ON DELETE CASCADE
+        );''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_transaction_totals_insert')
+        cursor.execute('''
+        CREATE TRIGGER trg_transaction_totals_insert AFTER INSERT ON transaction
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO customer_transaction_totals (customer_id, total)
+            SELECT customer_id, NEW.amount FROM account WHERE account_id = NEW.from_account_id
+            ON DUPLICATE KEY UPDATE total = total + NEW.amount;
+            IF NEW.to_account_id <> NEW.from_account_id THEN
+                INSERT INTO customer_transaction_totals (customer_id, total)
+                SELECT customer_id, NEW.amount FROM account WHERE account_id = NEW.to_account_id
+                ON DUPLICATE KEY UPDATE total = total + NEW.amount;
+            END IF;
+        END''')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_transaction_totals_delete')
+        cursor.execute('''
+        CREATE TRIGGER trg_transaction_totals_delete AFTER DELETE ON transaction
+        FOR EACH ROW
+        BEGIN
+            UPDATE customer_transaction_totals T
+            JOIN account A ON A.customer_id = T.customer_id
+            SET T.total = T.total - OLD.amount
+            WHERE A.account_id = OLD.from_account_id;
+            IF OLD.to_account_id <> OLD.from_account_id THEN
+                UPDATE customer_transaction_totals T
+                JOIN account A ON A.customer_id = T.customer_id
+                SET T.total = T.total - OLD.amount
+                WHERE A.account_id = OLD.to_account_id;
+            END IF;
+        END''')
+        # Money transfer run entirely on the server: one CALL replaces the
+        # lookups, balance check, updates and insert, and returns the
+        # transaction_timestamp it recorded. Failures SIGNAL SQLSTATE 45000
+        # with the message the API returns; the caller commits.
+        cursor.execute('DROP PROCEDURE IF EXISTS sp_money_transfer')
+        cursor.execute('''
+        CREATE PROCEDURE sp_money_transfer(
+            IN p_user_id CHAR(36),
+            IN p_sender_account_id CHAR(36),
+            IN p_receiver_account_id CHAR(36),
+            IN p_amount DECIMAL(15, 2),
+            IN p_transaction_id BINARY(16)
+        )
+        BEGIN
+            DECLARE v_customer_id CHAR(36);
+            DECLARE v_customer_exists CHAR(36);
+            DECLARE v_sender_customer_id CHAR(36);
+            DECLARE v_sender_balance DECIMAL(15, 2);
+            DECLARE v_receiver_account_id CHAR(36);
+            DECLARE v_locked INT;
+            DECLARE v_ts DATETIME(6);
+
+            -- Lock both rows in primary key order so opposite transfers cannot deadlock
+            SELECT COUNT(*) INTO v_locked FROM account
+            WHERE account_id IN (p_sender_account_id, p_receiver_account_id) FOR UPDATE;
+
+            -- user -> customer -> sender and receiver accounts in one lookup; a
+            -- missing link leaves its columns NULL (no user row leaves them all NULL).
+            -- The accounts are read as locking reads so the balance is current.
+            SELECT U.customer_id, C.customer_id, SA.customer_id, SA.balance, RA.account_id
+            INTO v_customer_id, v_customer_exists, v_sender_customer_id, v_sender_balance, v_receiver_account_id
+            FROM user U
+            LEFT JOIN customer C ON C.customer_id = U.customer_id
+            LEFT JOIN account SA ON SA.account_id = p_sender_account_id
+            LEFT JOIN account RA ON RA.account_id = p_receiver_account_id
+            WHERE U.user_id = UUID_TO_BIN(p_user_id)
+            FOR UPDATE OF SA, RA;
+
+            IF v_customer_id IS NULL THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'customer_id is None';
+            END IF;
+            IF v_customer_exists IS NULL THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No customer exists with this customer_id';
+            END IF;
+            IF v_sender_customer_id IS NULL THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No account exists with this account_id sender';
+            END IF;
+            IF v_sender_customer_id <> v_customer_id THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Access denied: This account is not connected with claimed customer_id';
+            END IF;
+            IF v_receiver_account_id IS NULL THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'No account exists with this account_id receiver';
+            END IF;
+            IF v_sender_balance < p_amount THEN
+                SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Insufficient balance';
+            END IF;
+
+            -- A transfer to the same account nets to zero
+            UPDATE account
+            SET balance = balance - IF(account_id = p_sender_account_id, p_amount, 0)
+                                  + IF(account_id = p_receiver_account_id, p_amount, 0)
+            WHERE account_id IN (p_sender_account_id, p_receiver_account_id);
+
+            -- Each statement in a procedure reads its own NOW(), so take it once
+            -- and both store and return that value
+            SET v_ts = NOW(6);
+            INSERT INTO transaction (transaction_id, from_account_id, to_account_id, transaction_type, amount, transaction_timestamp)
+            VALUES (p_transaction_id, p_sender_account_id, p_receiver_account_id, 'TRANSFER', p_amount, v_ts);
+
+            SELECT v_ts AS transaction_timestamp;
+        END''')
+    connection.commit()
+    connection.close()
+
+# One-off migration: rebuild customer_transaction_totals from the transaction
+# table. The triggers keep it current from then on, so this only needs to run
+# when the totals table is first added to an existing database, or to repair
+# drift, e.g. after accounts were moved to another customer.
+def backfill_transaction_totals():
+    connection = get_db_connection()
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM customer_transaction_totals')
+        cursor.execute('''
+        INSERT INTO customer_transaction_totals (customer_id, total)
+        SELECT A.customer_id, SUM(T.total)
+        FROM (
+            SELECT from_account_id AS account_id, SUM(amount) AS total
+            FROM transaction
+            GROUP BY from_account_id
+            UNION ALL
+            SELECT to_account_id, SUM(amount)
+            FROM transaction
+            WHERE to_account_id <> from_account_id
+            GROUP BY to_account_id
+        ) T
+        JOIN account A ON A.account_id = T.account_id
+        GROUP BY A.customer_id''')
     connection.commit()
     connection.close()
@@ -0,0 +1,26 @@
+# Production server settings, picked up by running `gunicorn app:app` from
+# this directory. Run `flask --app app init-db` once per deploy first; the
+# workers never touch the schema.
+import multiprocessing
+
+bind = '0.0.0.0:8000'
+
+# Threaded workers: argon2 and mysqlclient both release the GIL while they
+# work, so a request hashing a password or waiting on MySQL leaves the
+# worker's other threads serving. gevent is not used because mysqlclient's
+# C driver blocks the whole process instead of yielding to other greenlets.
+worker_class = 'gthread'
+workers = multiprocessing.cpu_count()
+
+# Each worker has its own connection pool; keep threads at or below
+# database.POOL_MAX_CONNECTIONS so no thread waits on a connection
+threads = 16
+
+# Import the app once in the master and fork the workers from it
+preload_app = True
+
+# Anything the master did with the database must not leak into the workers:
+# drop its pool so each worker opens connections of its own
+def post_fork(server, worker):
+    import database
+    database._pool = None
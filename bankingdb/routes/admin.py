@@ -1,16 +1,38 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import get_jwt, verify_jwt_in_request
 from functools import wraps
+import threading, time
 
 admin_blueprint = Blueprint('admin', __name__)
 
+# Raw Authorization header -> time until which it is known to carry a valid
+# admin token. Entries live at most ADMIN_CACHE_TTL seconds and never past
+# the token's own expiry, so a cache hit can skip decoding and verifying it.
+ADMIN_CACHE_TTL = 60
+ADMIN_CACHE_SIZE = 10000
+_admin_cache = {}
+_admin_cache_lock = threading.Lock()
+
 def admin_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        now = time.time()
+        if token and _admin_cache.get(token, 0) > now:
+            return fn(*args, **kwargs)
+
         verify_jwt_in_request()
         claims = get_jwt()
         
         if claims.get('role', None) == "ADMIN":
+            # Writers take the lock so eviction never iterates a dict another
+            # request thread is resizing; reads above stay lock-free
+            with _admin_cache_lock:
+                if len(_admin_cache) >= ADMIN_CACHE_SIZE:
+                    # Drop expired entries, or everything if they are all still live
+                    for key in [key for key, expires in _admin_cache.items() if expires <= now] or list(_admin_cache):
+                        _admin_cache.pop(key, None)
+                _admin_cache[token] = min(now + ADMIN_CACHE_TTL, claims.get('exp', now))
             return fn(*args, **kwargs)
         
         return jsonify({"msg": "Admins only! Access forbidden."}), 403
@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
-from werkzeug.security import check_password_hash
-from database import get_db_connection
+from database import db_cursor
+from .utils import hash_password, password_needs_rehash, verify_password, uuid_bytes
 import re
 
 auth_blueprint = Blueprint('auth', __name__)
 
+# Statements run on every login, built once at import
+_LOGIN_SQL = "SELECT BIN_TO_UUID(user_id) AS user_id, password, role FROM user WHERE username = %s"
+_REHASH_SQL = "UPDATE user SET password = %s WHERE user_id = %s"
+
 # Login route to authenticate users
 @auth_blueprint.route('/login', methods=['POST'])
 def login():
@@ -65,14 +69,17 @@ def login():
     username = re.sub(r"[^a-zA-Z0-9_]", "", username) 
 
     # Connect to the database
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    cursor.execute("SELECT * FROM user WHERE username = %s", (username,))
-    user = cursor.fetchone()
-    cursor.close()
-    connection.close()
+    with db_cursor() as cursor:
+        cursor.execute(_LOGIN_SQL, (username,))
+        user = cursor.fetchone()
+
+    if user and verify_password(user['password'], password):
+        # Upgrade hashes made with an older method or cost while the
+        # plaintext is at hand
+        if password_needs_rehash(user['password']):
+            with db_cursor(commit=True) as cursor:
+                cursor.execute(_REHASH_SQL, (hash_password(password), uuid_bytes(user['user_id'])))
 
-    if user and check_password_hash(user['password'], password):
         # Create a JWT token
         access_token = create_access_token(
             identity=user['user_id'], 
@@ -1,12 +1,23 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.exceptions import BadRequest
-import uuid
-from datetime import datetime
-from database import get_db_connection
+from werkzeug.exceptions import BadRequest, NotFound
+import uuid, csv, io
+from database import get_streaming_cursor, db_cursor
 from .admin import admin_required
+from .utils import ojsonify, ojsonify_stream, get_page_args, valid_uuid, uuid_bytes, require_fields
 
 customer_support_blueprint = Blueprint('customer_support', __name__)
 
+# ticket_id and employee_id are stored as BINARY(16); return them as UUID strings
+_TICKET_COLUMNS = """BIN_TO_UUID(CS.ticket_id) AS ticket_id, CS.customer_id, BIN_TO_UUID(CS.employee_id) AS employee_id,
+    CS.issue_description, CS.status, CS.created_date, CS.resolved_date"""
+
+# CSV import: required columns, optional columns with the value used when a
+# cell is empty (created_date falls back to the import time), and how many
+# rows go into each multi-row INSERT
+_IMPORT_REQUIRED = ['customer_id', 'employee_id', 'issue_description']
+_IMPORT_OPTIONAL = {'status': 'OPEN', 'created_date': None, 'resolved_date': None}
+_IMPORT_BATCH_SIZE = 5000
+
 # Create a new support ticket
 @customer_support_blueprint.route('/tickets', methods=['POST'])
 @admin_required
@@ -50,77 +61,51 @@ def create_ticket():
         description: Internal server error
     """
     data = request.get_json()
-    try:
-        # Validate required fields
-        required_fields = ['customer_id', 'employee_id', 'issue_description']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
-
-        try:
-            uuid.UUID(data['customer_id'])
-            uuid.UUID(data['employee_id'])
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID for customer_id or employee_id'})
-
-        # Get current date and time
-        created_date = datetime.now()
-
-        # Generate unique ticket ID
-        ticket_id = str(uuid.uuid4())
-
-        # Connect to database and create cursor
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        # Prepare SQL query
-        query = """
-        INSERT INTO customer_support (ticket_id, customer_id, employee_id, issue_description, status, created_date, resolved_date)
-        VALUES (%s, %s, %s, %s, 'OPEN', %s, NULL)
-        """
-        params = (
-        ticket_id,
-        data['customer_id'],
-        data['employee_id'],
-        data['issue_description'],
-        created_date,
-        )
+    # Validate required fields
+    require_fields(data, ['customer_id', 'employee_id', 'issue_description'])
 
-        # Execute query and commit changes
-        cursor.execute(query, params)
-        connection.commit()
+    if not valid_uuid(data['customer_id']) or not valid_uuid(data['employee_id']):
+        raise BadRequest('Invalid UUID for customer_id or employee_id')
 
-        # Close connection and cursor
-        cursor.close()
-        connection.close()
+    # Generate unique ticket ID
+    ticket_id = uuid.uuid4()
 
-        return jsonify({"message": "Ticket created successfully", "ticket_id": ticket_id}), 201
+    # Prepare SQL query
+    query = """
+    INSERT INTO customer_support (ticket_id, customer_id, employee_id, issue_description, status)
+    VALUES (%s, %s, %s, %s, 'OPEN')
+    """
+    params = (
+    ticket_id.bytes,
+    data['customer_id'],
+    uuid_bytes(data['employee_id']),
+    data['issue_description'],
+    )
+
+    # Execute query and commit changes
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(query, params)
 
-    except BadRequest as e:
-        return jsonify({"error": str(e)}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Ticket created successfully", "ticket_id": str(ticket_id)}), 201
 
-# Get all support tickets
-@customer_support_blueprint.route('/tickets', methods=['GET'])
+# Create several support tickets in one transaction
+@customer_support_blueprint.route('/tickets/bulk', methods=['POST'])
 @admin_required
-def get_tickets():
+def create_tickets_bulk():
     """
-    Get all support tickets
+    Create several support tickets at once
     ---
     tags:
       - Customer Support
-    responses:
-      200:
-        description: List of all tickets
+    parameters:
+      - name: body
+        in: body
+        required: true
         schema:
           type: array
           items:
             type: object
             properties:
-              ticket_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174002
               customer_id:
                 type: string
                 example: 123e4567-e89b-12d3-a456-426614174000
@@ -130,31 +115,221 @@ def get_tickets():
               issue_description:
                 type: string
                 example: Customer is unable to access their account
-              status:
-                type: string
-                example: OPEN
-              created_date:
-                type: string
-                example: 2024-01-05T12:00:00
-              resolved_date:
+    responses:
+      201:
+        description: Tickets created successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: Tickets created successfully
+            ticket_ids:
+              type: array
+              items:
                 type: string
-                nullable: true
-                example: 2024-01-10T15:30:00
+                example: 123e4567-e89b-12d3-a456-426614174002
+      400:
+        description: Validation error
+      500:
+        description: Internal server error
+    """
+    data = request.get_json()
+    if not isinstance(data, list) or not data:
+        raise BadRequest("Request body must be a non-empty array of tickets")
+
+    # Validate every ticket before touching the database
+    required_fields = ['customer_id', 'employee_id', 'issue_description']
+    for index, ticket in enumerate(data):
+        try:
+            require_fields(ticket, required_fields)
+        except BadRequest as e:
+            raise BadRequest(f"Ticket {index}: {e.description}")
+        if not valid_uuid(ticket['customer_id']) or not valid_uuid(ticket['employee_id']):
+            raise BadRequest(f"Ticket {index}: invalid UUID for customer_id or employee_id")
+
+    rows = [
+        (uuid.uuid4().bytes, ticket['customer_id'], uuid_bytes(ticket['employee_id']), ticket['issue_description'], 'OPEN')
+        for ticket in data
+    ]
+
+    # One executemany batch and a single commit
+    with db_cursor(commit=True) as cursor:
+        cursor.executemany("""
+        INSERT INTO customer_support (ticket_id, customer_id, employee_id, issue_description, status)
+        VALUES (%s, %s, %s, %s, %s)
+        """, rows)
+
+    return jsonify({"message": "Tickets created successfully", "ticket_ids": [str(uuid.UUID(bytes=row[0])) for row in rows]}), 201
+
+# Import historical tickets from a CSV upload
+@customer_support_blueprint.route('/tickets/import', methods=['POST'])
+@admin_required
+def import_tickets():
+    """
+    Import support tickets from CSV
+    ---
+    tags:
+      - Customer Support
+    consumes:
+      - text/csv
+    parameters:
+      - name: body
+        in: body
+        required: true
+        description: >
+          CSV with a header row. customer_id, employee_id and issue_description
+          are required; status, created_date and resolved_date are optional.
+        schema:
+          type: string
+          example: |
+            customer_id,employee_id,issue_description,status,created_date
+            123e4567-e89b-12d3-a456-426614174000,123e4567-e89b-12d3-a456-426614174001,Card declined,RESOLVED,2024-01-15 10:30:00
+    responses:
+      201:
+        description: Tickets imported successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: Tickets imported successfully
+            imported:
+              type: integer
+              example: 250000
+      400:
+        description: Validation error
       500:
         description: Internal server error
     """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM customer_support")
-        tickets = cursor.fetchall()
-        cursor.close()
-        connection.close()
+    # Decode the upload as it arrives instead of buffering the whole body
+    reader = csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8', newline=''))
+    header = reader.fieldnames or []
+
+    missing_fields = [field for field in _IMPORT_REQUIRED if field not in header]
+    if missing_fields:
+        raise BadRequest(f"Missing required columns: {', '.join(missing_fields)}")
+
+    optional_columns = [field for field in _IMPORT_OPTIONAL if field in header]
+    columns = ['ticket_id'] + _IMPORT_REQUIRED + optional_columns
+    query = f"""
+    INSERT INTO customer_support ({', '.join(columns)})
+    VALUES ({', '.join(['%s'] * len(columns))})
+    """
 
-        return jsonify(tickets), 200
+    imported = 0
+    with db_cursor(commit=True) as cursor:
+        # Rows without a created_date get the database time of the import
+        cursor.execute("SELECT NOW() AS now")
+        defaults = dict(_IMPORT_OPTIONAL, created_date=cursor.fetchone()['now'])
+
+        batch = []
+        for line, row in enumerate(reader, start=2):
+            if not valid_uuid(row['customer_id']) or not valid_uuid(row['employee_id']):
+                raise BadRequest(f"Line {line}: invalid UUID for customer_id or employee_id")
+            if row.get('status') and row['status'] not in ('OPEN', 'IN_PROGRESS', 'RESOLVED'):
+                raise BadRequest(f"Line {line}: invalid status {row['status']}")
+
+            batch.append(
+                (uuid.uuid4().bytes, row['customer_id'], uuid_bytes(row['employee_id']), row['issue_description'])
+                + tuple(row[field] or defaults[field] for field in optional_columns)
+            )
+            if len(batch) == _IMPORT_BATCH_SIZE:
+                cursor.executemany(query, batch)
+                imported += len(batch)
+                batch = []
+
+        if batch:
+            cursor.executemany(query, batch)
+            imported += len(batch)
+
+    return jsonify({"message": "Tickets imported successfully", "imported": imported}), 201
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+# Get all support tickets
+@customer_support_blueprint.route('/tickets', methods=['GET'])
+@admin_required
+def get_tickets():
+    """
+    Get all support tickets, newest first
+    ---
+    tags:
+      - Customer Support
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 50
+        example: 50
+        description: Maximum number of tickets to return (at most 500).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174002
+        description: Return the page following this ID (the next_cursor of the previous page).
+    responses:
+      200:
+        description: List of all tickets
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  ticket_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174002
+                  customer_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174000
+                  employee_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174001
+                  issue_description:
+                    type: string
+                    example: Customer is unable to access their account
+                  status:
+                    type: string
+                    example: OPEN
+                  created_date:
+                    type: string
+                    example: 2024-01-05T12:00:00
+                  resolved_date:
+                    type: string
+                    nullable: true
+                    example: 2024-01-10T15:30:00
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174002
+              description: Pass as ?after= to fetch the next page; null on the last page
+      500:
+        description: Internal server error
+    """
+    limit, after = get_page_args()
+    if after and not valid_uuid(after):
+        raise BadRequest('Invalid UUID string for after')
+
+    cursor = get_streaming_cursor()
+    if after:
+        cursor.execute(f"""
+        SELECT {_TICKET_COLUMNS} FROM customer_support CS
+        WHERE (CS.created_date, CS.ticket_id) < (
+            SELECT created_date, ticket_id FROM customer_support WHERE ticket_id = %s
+        )
+        ORDER BY CS.created_date DESC, CS.ticket_id DESC
+        LIMIT %s
+        """, (uuid_bytes(after), limit))
+    else:
+        cursor.execute(f"""
+        SELECT {_TICKET_COLUMNS} FROM customer_support CS
+        ORDER BY CS.created_date DESC, CS.ticket_id DESC
+        LIMIT %s
+        """, (limit,))
+
+    return ojsonify_stream(cursor, cursor_key='ticket_id', limit=limit)
 
 # Get a specific support ticket by ID
 @customer_support_blueprint.route('/tickets/<ticket_id>', methods=['GET'])
@@ -204,26 +379,17 @@ def get_ticket(ticket_id):
       500:
         description: Internal server error
     """
-    try:
-        try:
-            uuid.UUID(ticket_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for ticket_id'})
+    if not valid_uuid(ticket_id):
+        raise BadRequest('Invalid UUID string for ticket_id')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM customer_support WHERE ticket_id = %s", (ticket_id,))
+    with db_cursor() as cursor:
+        cursor.execute(f"SELECT {_TICKET_COLUMNS} FROM customer_support CS WHERE CS.ticket_id = %s", (uuid_bytes(ticket_id),))
         ticket = cursor.fetchone()
-        cursor.close()
-        connection.close()
-
-        if not ticket:
-            return jsonify({"error": "Ticket not found"}), 404
 
-        return jsonify(ticket), 200
+    if not ticket:
+        raise NotFound("Ticket not found")
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return ojsonify(ticket)
 
 # Update ticket status (e.g., 'IN_PROGRESS', 'RESOLVED')
 @customer_support_blueprint.route('/tickets/<ticket_id>/status', methods=['PUT'])
@@ -267,45 +433,29 @@ def update_ticket_status(ticket_id):
         description: Internal server error
     """
     data = request.get_json()
-    try:
-        try:
-            uuid.UUID(ticket_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for ticket_id'})
-
-        if 'status' not in data:
-            return jsonify({"error": "Status is required"}), 400
-
-        valid_statuses = ['OPEN', 'IN_PROGRESS', 'RESOLVED']
-        if data['status'] not in valid_statuses:
-            return jsonify({"error": "Invalid status. Valid statuses are: {', '.join(valid_statuses)}"}), 400
+    if not valid_uuid(ticket_id):
+        raise BadRequest('Invalid UUID string for ticket_id')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    if not data or 'status' not in data:
+        raise BadRequest("Status is required")
 
-        # Set resolved_date if status is 'RESOLVED'
-        if data['status'] == 'RESOLVED':
-            resolved_date = datetime.now()
-        else:
-            resolved_date = None
+    valid_statuses = ['OPEN', 'IN_PROGRESS', 'RESOLVED']
+    if data['status'] not in valid_statuses:
+        raise BadRequest(f"Invalid status. Valid statuses are: {', '.join(valid_statuses)}")
 
+    # Stamp resolved_date with the database clock when the ticket is resolved
+    with db_cursor(commit=True) as cursor:
         cursor.execute("""
         UPDATE customer_support 
-        SET status = %s, resolved_date = %s 
+        SET status = %s, resolved_date = CASE WHEN %s = 'RESOLVED' THEN NOW() ELSE NULL END
         WHERE ticket_id = %s
-        """, (data['status'], resolved_date, ticket_id))
-        connection.commit()
+        """, (data['status'], data['status'], uuid_bytes(ticket_id)))
+        found = cursor.rowcount
 
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Ticket not found"}), 404
+    if found == 0:
+        raise NotFound("Ticket not found")
 
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Ticket status updated successfully"}), 200
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Ticket status updated successfully"}), 200
 
 # Delete a ticket (Note: Ticket deletion might have business implications, handle with care)
 @customer_support_blueprint.route('/tickets/<ticket_id>', methods=['DELETE'])
@@ -336,28 +486,18 @@ def delete_ticket(ticket_id):
       500:
         description: Internal server error
     """
-    try:
-        try:
-            uuid.UUID(ticket_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for ticket_id'})
+    if not valid_uuid(ticket_id):
+        raise BadRequest('Invalid UUID string for ticket_id')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM customer_support WHERE ticket_id = %s", (ticket_id,))
-        connection.commit()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute("DELETE FROM customer_support WHERE ticket_id = %s", (uuid_bytes(ticket_id),))
+        found = cursor.rowcount
 
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Ticket not found"}), 404
+    if found == 0:
+        raise NotFound("Ticket not found")
 
-        cursor.close()
-        connection.close()
+    return jsonify({"message": "Ticket deleted successfully"}), 200
 
-        return jsonify({"message": "Ticket deleted successfully"}), 200
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    
 @customer_support_blueprint.route('/top_resolvers', methods=['GET'])
 @admin_required
 def api_employees_top_resolvers():
@@ -391,37 +531,27 @@ def api_employees_top_resolvers():
       500:
         description: Internal server error
     """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-        WITH ResolvedTickets AS (
-            SELECT E.employee_id, E.first_name, E.last_name, COUNT(CS.ticket_id) AS resolved_tickets
-            FROM employee E
-            JOIN customer_support CS ON E.employee_id = CS.employee_id
-            WHERE CS.status = 'RESOLVED'
-            GROUP BY E.employee_id, E.first_name, E.last_name
-        )
-        SELECT employee_id, first_name, last_name, resolved_tickets
-        FROM ResolvedTickets
-        WHERE resolved_tickets = (
-            SELECT MAX(resolved_tickets) FROM ResolvedTickets
-        );
-        """
+    # Rank the per-employee counts in the same pass that computes them,
+    # keeping every employee tied for first place. The aggregation gets a
+    # longer time budget than the session default.
+    query = """
+    SELECT /*+ MAX_EXECUTION_TIME(30000) */ employee_id, first_name, last_name, resolved_tickets
+    FROM (
+        SELECT BIN_TO_UUID(E.employee_id) AS employee_id, E.first_name, E.last_name,
+               COUNT(*) AS resolved_tickets,
+               RANK() OVER (ORDER BY COUNT(*) DESC) AS rk
+        FROM employee E
+        JOIN customer_support CS ON E.employee_id = CS.employee_id
+        WHERE CS.status = 'RESOLVED'
+        GROUP BY E.employee_id, E.first_name, E.last_name
+    ) AS ranked
+    WHERE rk = 1;
+    """
+    with db_cursor() as cursor:
         cursor.execute(query)
         results = cursor.fetchall()
 
-        if not results:
-            return jsonify({'message': 'No employees found meeting the criteria.'}), 404
-
-        return jsonify(results)
-
-    except Exception as e:
-        return jsonify({'error': 'An error occurred while fetching top resolvers.', 'details': str(e)}), 500
+    if not results:
+        return jsonify({'message': 'No employees found meeting the criteria.'}), 404
 
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
+    return ojsonify(results)
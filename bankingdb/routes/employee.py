@@ -1,12 +1,25 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import BadRequest, NotFound
 import uuid, re
 from datetime import datetime
-from database import get_db_connection
+from database import get_streaming_cursor, db_cursor
 from .admin import admin_required
+from .utils import ojsonify, ojsonify_stream, get_page_args, valid_uuid, uuid_bytes, require_fields
 
 employee_blueprint = Blueprint('employee', __name__)
 
+_EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
+# employee_id is stored as BINARY(16); return it as a UUID string
+_EMPLOYEE_COLUMNS = """BIN_TO_UUID(E.employee_id) AS employee_id, E.branch_id, E.first_name, E.last_name,
+    E.position, E.hire_date, E.phone_number, E.email"""
+
+# Columns update_employee may change, in the order of _UPDATE_EMPLOYEE's parameters
+_UPDATE_FIELDS = ('branch_id', 'first_name', 'last_name', 'position', 'hire_date', 'phone_number', 'email')
+_UPDATE_EMPLOYEE = "UPDATE employee SET " + ", ".join(
+    f"{field} = COALESCE(%s, {field})" for field in _UPDATE_FIELDS
+) + " WHERE employee_id = %s"
+
 # Create a new employee
 @employee_blueprint.route('/employees', methods=['POST'])
 @admin_required
@@ -63,62 +76,43 @@ def create_employee():
         description: Internal server error
     """
     data = request.get_json()
-    try:
-        # Validate required fields
-        required_fields = ['branch_id', 'first_name', 'last_name', 'position', 'hire_date', 'phone_number', 'email']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
-        
-        try:
-            uuid.UUID(data['branch_id'])
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for branch_id'})
-
-        # Validate email format
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", data['email']):
-            raise BadRequest("Invalid email format.")
-        
-        # Generate unique employee ID
-        employee_id = str(uuid.uuid4())
-
-        # Parse hire_date
-        hire_date = datetime.fromisoformat(data['hire_date'])
-
-        # Connect to database and create cursor
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        # Prepare SQL query
-        query = """
-        INSERT INTO employee (employee_id, branch_id, first_name, last_name, position, hire_date, phone_number, email)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        params = (
-        employee_id,
-        data['branch_id'],
-        data['first_name'],
-        data['last_name'],
-        data['position'],
-        hire_date,
-        data['phone_number'],
-        data['email'],
-        )
-
-        # Execute query and commit changes
+    # Validate required fields
+    require_fields(data, ['branch_id', 'first_name', 'last_name', 'position', 'hire_date', 'phone_number', 'email'])
+    
+    if not valid_uuid(data['branch_id']):
+        raise BadRequest('Invalid UUID string for branch_id')
+
+    # Validate email format
+    if not _EMAIL_RE.match(data['email']):
+        raise BadRequest("Invalid email format.")
+    
+    # Generate unique employee ID
+    employee_id = uuid.uuid4()
+
+    # Parse hire_date
+    hire_date = datetime.fromisoformat(data['hire_date'])
+
+    # Prepare SQL query
+    query = """
+    INSERT INTO employee (employee_id, branch_id, first_name, last_name, position, hire_date, phone_number, email)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    params = (
+    employee_id.bytes,
+    data['branch_id'],
+    data['first_name'],
+    data['last_name'],
+    data['position'],
+    hire_date,
+    data['phone_number'],
+    data['email'],
+    )
+
+    # Execute query and commit changes
+    with db_cursor(commit=True) as cursor:
         cursor.execute(query, params)
-        connection.commit()
-
-        # Close connection and cursor
-        cursor.close()
-        connection.close()
 
-        return jsonify({"message": "Employee created successfully", "employee_id": employee_id}), 201
-
-    except BadRequest as e:
-        return jsonify({"error": str(e)}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Employee created successfully", "employee_id": str(employee_id)}), 201
 
 # Get all employees
 @employee_blueprint.route('/employees', methods=['GET'])
@@ -129,53 +123,73 @@ def get_employees():
     ---
     tags:
       - Employees
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 50
+        example: 50
+        description: Maximum number of employees to return (at most 500).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174004
+        description: Return the page following this ID (the next_cursor of the previous page).
     responses:
       200:
         description: List of all employees
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              employee_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174004
-              branch_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174003
-              first_name:
-                type: string
-                example: John
-              last_name:
-                type: string
-                example: Doe
-              position:
-                type: string
-                example: Manager
-              hire_date:
-                type: string
-                example: 2024-01-01
-              phone_number:
-                type: string
-                example: 1234567890
-              email:
-                type: string
-                example: john.doe@example.com
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  employee_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174004
+                  branch_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  first_name:
+                    type: string
+                    example: John
+                  last_name:
+                    type: string
+                    example: Doe
+                  position:
+                    type: string
+                    example: Manager
+                  hire_date:
+                    type: string
+                    example: 2024-01-01
+                  phone_number:
+                    type: string
+                    example: 1234567890
+                  email:
+                    type: string
+                    example: john.doe@example.com
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174004
+              description: Pass as ?after= to fetch the next page; null on the last page
       500:
         description: Internal server error
     """
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM employee")
-        employees = cursor.fetchall()
-        cursor.close()
-        connection.close()
+    limit, after = get_page_args()
+    if after and not valid_uuid(after):
+        raise BadRequest('Invalid UUID string for after')
 
-        return jsonify(employees), 200
+    cursor = get_streaming_cursor()
+    if after:
+        cursor.execute(f"SELECT {_EMPLOYEE_COLUMNS} FROM employee E WHERE E.employee_id > %s ORDER BY E.employee_id LIMIT %s", (uuid_bytes(after), limit))
+    else:
+        cursor.execute(f"SELECT {_EMPLOYEE_COLUMNS} FROM employee E ORDER BY E.employee_id LIMIT %s", (limit,))
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return ojsonify_stream(cursor, cursor_key='employee_id', limit=limit)
 
 # Get a specific employee by ID
 @employee_blueprint.route('/employees/<employee_id>', methods=['GET'])
@@ -227,26 +241,17 @@ def get_employee(employee_id):
       500:
         description: Internal server error
     """
-    try:
-        try:
-            uuid.UUID(employee_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for employee_id'})
+    if not valid_uuid(employee_id):
+        raise BadRequest('Invalid UUID string for employee_id')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM employee WHERE employee_id = %s", (employee_id,))
+    with db_cursor() as cursor:
+        cursor.execute(f"SELECT {_EMPLOYEE_COLUMNS} FROM employee E WHERE E.employee_id = %s", (uuid_bytes(employee_id),))
         employee = cursor.fetchone()
-        cursor.close()
-        connection.close()
-
-        if not employee:
-            return jsonify({"error": "Employee not found"}), 404
 
-        return jsonify(employee), 200
+    if not employee:
+        raise NotFound("Employee not found")
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return ojsonify(employee)
 
 # Update an employee
 @employee_blueprint.route('/employees/<employee_id>', methods=['PUT'])
@@ -308,65 +313,31 @@ def update_employee(employee_id):
         description: Internal server error
     """
     data = request.get_json()
-    try:
-        try:
-            uuid.UUID(employee_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for employee_id'})
+    if not valid_uuid(employee_id):
+        raise BadRequest('Invalid UUID string for employee_id')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
+    # Every updatable column is always in the statement; a NULL parameter
+    # keeps the current value, so the SQL text never changes
+    params = [data.get(field) for field in _UPDATE_FIELDS]
+    if all(value is None for value in params):
+        raise BadRequest("No valid fields to update")
 
-        # Prepare update statements
-        updates = []
-        params = []
-        if 'branch_id' in data:
-            updates.append("branch_id = %s")
-            params.append(data['branch_id'])
-        if 'first_name' in data:
-            updates.append("first_name = %s")
-            params.append(data['first_name'])
-        if 'last_name' in data:
-            updates.append("last_name = %s")
-            params.append(data['last_name'])
-        if 'position' in data:
-            updates.append("position = %s")
-            params.append(data['position'])
-        if 'hire_date' in data:
-            updates.append("hire_date = %s")
-            params.append(datetime.fromisoformat(data['hire_date']))
-        if 'phone_number' in data:
-            updates.append("phone_number = %s")
-            params.append(data['phone_number'])
-        if 'email' in data:
-            updates.append("email = %s")
-            params.append(data['email'])
+    if data.get('hire_date') is not None:
+        params[_UPDATE_FIELDS.index('hire_date')] = datetime.fromisoformat(data['hire_date'])
 
-        if not updates:
-            return jsonify({"error": "No valid fields to update"}), 400
+    # Add employee_id to the end of the params list
+    params.append(uuid_bytes(employee_id))
 
-        # Add employee_id to the end of the params list
-        params.append(employee_id)
+    # Execute the query and commit changes
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(_UPDATE_EMPLOYEE, tuple(params))
+        found = cursor.rowcount
 
-        # Construct the SQL UPDATE query
-        query = f"UPDATE employee SET {', '.join(updates)} WHERE employee_id = %s"
+    # Check if any rows matched
+    if found == 0:
+        raise NotFound("Employee not found")
 
-        # Execute the query and commit changes
-        cursor.execute(query, tuple(params))
-        connection.commit()
-
-        # Check if any rows were affected
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Employee not found"}), 404
-
-        # Close connection and cursor
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Employee updated successfully"}), 200
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({"message": "Employee updated successfully"}), 200
 
 # Delete an employee
 @employee_blueprint.route('/employees/<employee_id>', methods=['DELETE'])
@@ -397,24 +368,14 @@ def delete_employee(employee_id):
       500:
         description: Internal server error
     """
-    try:
-        try:
-            uuid.UUID(employee_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for employee_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM employee WHERE employee_id = %s", (employee_id,))
-        connection.commit()
-
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Employee not found"}), 404
+    if not valid_uuid(employee_id):
+        raise BadRequest('Invalid UUID string for employee_id')
 
-        cursor.close()
-        connection.close()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute("DELETE FROM employee WHERE employee_id = %s", (uuid_bytes(employee_id),))
+        found = cursor.rowcount
 
-        return jsonify({"message": "Employee deleted successfully"}), 200
+    if found == 0:
+        raise NotFound("Employee not found")
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+    return jsonify({"message": "Employee deleted successfully"}), 200
@@ -1,12 +1,37 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.exceptions import BadRequest
+from MySQLdb import DataError
 import uuid
 from datetime import date
-from database import get_db_connection
+from database import db_cursor
 from .admin import admin_required
+from .utils import ojsonify, raw_json, get_page_args, valid_uuid, uuid_bytes, cached_response, bump_cache_version
 
 loan_blueprint = Blueprint('loan', __name__)
 
+# Columns returned by the read endpoints, matching the documented schema;
+# loan_id is stored as BINARY(16) and returned as a UUID string
+_LOAN_COLUMNS = """BIN_TO_UUID(L.loan_id) AS loan_id, L.customer_id, L.loan_type, L.principal_amount,
+    L.interest_rate, L.start_date, L.end_date, L.status"""
+
+# Statements (see the note in database.py)
+_INSERT_LOAN_SQL = """
+INSERT INTO loan (loan_id, customer_id, loan_type, principal_amount, interest_rate, start_date, end_date, status)
+VALUES (%s, %s, %s, %s, %s, %s, %s, 'ACTIVE')
+"""
+_LIST_LOANS_SQL = f"""
+SELECT {_LOAN_COLUMNS} FROM loan L
+WHERE (%s IS NULL OR L.loan_id > %s)
+ORDER BY L.loan_id
+LIMIT %s
+"""
+_SELECT_LOAN_SQL = f"SELECT {_LOAN_COLUMNS} FROM loan L WHERE L.loan_id = %s"
+
+# Pre-encoded success bodies; loan_id is a generated UUID, so it never needs escaping
+_CREATED_LOAN_TMPL = b'{"message":"Loan created successfully","loan_id":"%s"}'
+_UPDATED_LOAN_BODY = b'{"message":"Loan status updated successfully"}'
+_DELETED_LOAN_BODY = b'{"message":"Loan deleted successfully"}'
+
 # Create a new loan
 @loan_blueprint.route('/loans', methods=['POST'])
 @admin_required
@@ -72,15 +97,10 @@ def create_loan():
             raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
 
         # Validate customer_id
-        try:
-            uuid.UUID(data['customer_id'])
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for customer_id'})
+        if not valid_uuid(data['customer_id']):
+            return jsonify({'error': 'Invalid UUID string for customer_id'}), 400
 
-        # Validate loan type
-        valid_loan_types = ['HOME', 'AUTO', 'PERSONAL']
-        if data['loan_type'] not in valid_loan_types:
-            raise BadRequest(f"Invalid loan type. Valid types are: {', '.join(valid_loan_types)}")
+        # loan_type is checked by the ENUM column itself; see the DataError handler
 
         # Validate dates
         start_date = date.fromisoformat(data['start_date'])
@@ -89,19 +109,10 @@ def create_loan():
             raise BadRequest("Start date must be before end date.")
 
         # Generate unique loan ID
-        loan_id = str(uuid.uuid4())
-
-        # Connect to database and create cursor
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        loan_id = uuid.uuid4()
 
-        # Prepare SQL query
-        query = """
-        INSERT INTO loan (loan_id, customer_id, loan_type, principal_amount, interest_rate, start_date, end_date, status)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, 'ACTIVE')
-        """
         params = (
-        loan_id,
+        loan_id.bytes,
         data['customer_id'],
         data['loan_type'],
         data['principal_amount'],
@@ -111,77 +122,102 @@ def create_loan():
         )
 
         # Execute query and commit changes
-        cursor.execute(query, params)
-        connection.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(_INSERT_LOAN_SQL, params)
+        bump_cache_version('loan')
 
-        # Close connection and cursor
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Loan created successfully", "loan_id": loan_id}), 201
+        return raw_json(_CREATED_LOAN_TMPL % str(loan_id).encode(), 201)
 
     except BadRequest as e:
         return jsonify({"error": str(e)}), 400
+    except DataError as e:
+        return jsonify({"error": "Invalid value", "detail": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # Get all loans
 @loan_blueprint.route('/loans', methods=['GET'])
 @admin_required
+@cached_response('loan')
 def get_loans():
     """
     Get all loans
     ---
     tags:
       - Loans
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        example: 100
+        description: Maximum number of loans to return (at most 500).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174003
+        description: Return the page following this ID (the next_cursor of the previous page).
     responses:
       200:
         description: List of loans
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              loan_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174003
-              customer_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174000
-              loan_type:
-                type: string
-                example: PERSONAL
-              principal_amount:
-                type: number
-                example: 50000.00
-              interest_rate:
-                type: number
-                example: 5.5
-              start_date:
-                type: string
-                format: date
-                example: 2024-01-01
-              end_date:
-                type: string
-                format: date
-                example: 2027-01-01
-              status:
-                type: string
-                example: ACTIVE
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  loan_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  customer_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174000
+                  loan_type:
+                    type: string
+                    example: PERSONAL
+                  principal_amount:
+                    type: number
+                    example: 50000.00
+                  interest_rate:
+                    type: number
+                    example: 5.5
+                  start_date:
+                    type: string
+                    format: date
+                    example: 2024-01-01
+                  end_date:
+                    type: string
+                    format: date
+                    example: 2027-01-01
+                  status:
+                    type: string
+                    example: ACTIVE
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174003
+              description: Pass as ?after= to fetch the next page; null on the last page
       403:
         description: Access forbidden (Admin only)
       500:
         description: Internal server error
     """
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM loan")
-        loans = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        limit, after = get_page_args(default_limit=100)
+        if after and not valid_uuid(after):
+            return jsonify({'error': 'Invalid UUID string for after'}), 400
 
-        return jsonify(loans), 200
+        # Keyset pagination on the primary key
+        with db_cursor() as cursor:
+            after = uuid_bytes(after) if after else None
+            cursor.execute(_LIST_LOANS_SQL, (after, after, limit))
+            loans = cursor.fetchall()
+
+        next_cursor = loans[-1]['loan_id'] if len(loans) == limit else None
+        return ojsonify({"items": loans, "next_cursor": next_cursor})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -189,6 +225,7 @@ def get_loans():
 # Get a specific loan by ID
 @loan_blueprint.route('/loans/<loan_id>', methods=['GET'])
 @admin_required
+@cached_response('loan')
 def get_loan(loan_id):
     """
     Get a specific loan by ID
@@ -241,17 +278,12 @@ def get_loan(loan_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(loan_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM loan WHERE loan_id = %s", (loan_id,))
-        loan = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        if not valid_uuid(loan_id):
+            return jsonify({'error': 'Invalid UUID string for loan_id'}), 400
+
+        with db_cursor() as cursor:
+            cursor.execute(_SELECT_LOAN_SQL, (uuid_bytes(loan_id),))
+            loan = cursor.fetchone()
 
         if not loan:
             return jsonify({"error": "Loan not found"}), 404
@@ -306,32 +338,25 @@ def update_loan_status(loan_id):
     """
     data = request.get_json()
     try:
-        try:
-            uuid.UUID(loan_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
+        if not valid_uuid(loan_id):
+            return jsonify({'error': 'Invalid UUID string for loan_id'}), 400
 
         if 'status' not in data:
             return jsonify({"error": "Status is required"}), 400
 
-        valid_statuses = ['ACTIVE', 'PAID_OFF', 'DEFAULT']
-        if data['status'] not in valid_statuses:
-            return jsonify({"error": "Invalid status. Valid statuses are: {', '.join(valid_statuses)}"}), 400
+        # status is checked by the ENUM column itself; see the DataError handler
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("UPDATE loan SET status = %s WHERE loan_id = %s", (data['status'], uuid_bytes(loan_id)))
+            found = cursor.rowcount
+        bump_cache_version('loan')
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        cursor.execute("UPDATE loan SET status = %s WHERE loan_id = %s", (data['status'], loan_id))
-        connection.commit()
-
-        if cursor.rowcount == 0:
+        if found == 0:
             return jsonify({"error": "Loan not found"}), 404
 
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Loan status updated successfully"}), 200
+        return raw_json(_UPDATED_LOAN_BODY)
 
+    except DataError as e:
+        return jsonify({"error": "Invalid value", "detail": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -367,23 +392,18 @@ def delete_loan(loan_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(loan_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
+        if not valid_uuid(loan_id):
+            return jsonify({'error': 'Invalid UUID string for loan_id'}), 400
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM loan WHERE loan_id = %s", (loan_id,))
-        connection.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM loan WHERE loan_id = %s", (uuid_bytes(loan_id),))
+            found = cursor.rowcount
+        bump_cache_version('loan')
 
-        if cursor.rowcount == 0:
+        if found == 0:
             return jsonify({"error": "Loan not found"}), 404
 
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Loan deleted successfully"}), 200
+        return raw_json(_DELETED_LOAN_BODY)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,12 +1,43 @@
 from flask import Blueprint, request, jsonify
 from werkzeug.exceptions import BadRequest
 import uuid
-from datetime import datetime
-from database import get_db_connection
+from decimal import Decimal, InvalidOperation
+from database import db_cursor
 from .admin import admin_required
+from .utils import ojsonify, raw_json, get_page_args, valid_uuid, uuid_bytes, cached_response, bump_cache_version
 
 loan_payment_blueprint = Blueprint('loan_payment', __name__)
 
+# Columns returned by the read endpoints, matching the documented schema;
+# the IDs are stored as BINARY(16) and returned as UUID strings
+_LOAN_PAYMENT_COLUMNS = """BIN_TO_UUID(P.loan_payment_id) AS loan_payment_id, BIN_TO_UUID(P.loan_id) AS loan_id,
+    P.payment_date, P.payment_amount, P.remaining_balance"""
+
+# The payment is inserted only if it does not exceed the loan's principal
+_INSERT_PAYMENT_SQL = """
+INSERT INTO loan_payment (loan_payment_id, loan_id, payment_date, payment_amount, remaining_balance)
+SELECT %(loan_payment_id)s, loan_id, NOW(), %(payment_amount)s, principal_amount - %(payment_amount)s
+FROM loan
+WHERE loan_id = %(loan_id)s AND principal_amount - %(payment_amount)s >= 0
+"""
+_LIST_PAYMENTS_SQL = f"""
+SELECT {_LOAN_PAYMENT_COLUMNS} FROM loan_payment P
+WHERE (%s IS NULL OR P.loan_payment_id > %s)
+ORDER BY P.loan_payment_id
+LIMIT %s
+"""
+_LIST_LOAN_PAYMENTS_SQL = f"""
+SELECT {_LOAN_PAYMENT_COLUMNS} FROM loan_payment P
+WHERE P.loan_id = %s
+ORDER BY P.payment_date DESC
+LIMIT %s
+"""
+_SELECT_PAYMENT_SQL = f"SELECT {_LOAN_PAYMENT_COLUMNS} FROM loan_payment P WHERE P.loan_payment_id = %s"
+
+# Pre-encoded success bodies, as in loan.py
+_CREATED_PAYMENT_TMPL = b'{"message":"Loan payment recorded successfully","loan_payment_id":"%s"}'
+_DELETED_PAYMENT_BODY = b'{"message":"Loan payment deleted successfully"}'
+
 # Create a new loan payment
 @loan_payment_blueprint.route('/loan_payments', methods=['POST'])
 @admin_required
@@ -56,55 +87,141 @@ def create_loan_payment():
         if missing_fields:
             raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
 
-        try:
-            uuid.UUID(data['loan_id'])
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
-
-        # Get current date and time
-        payment_date = datetime.now()
-
-        # Get loan details to calculate remaining balance
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT principal_amount FROM loan WHERE loan_id = %s", (data['loan_id'],))
-        result = cursor.fetchone()
-        if not result:
-            return jsonify({"error": "Loan not found"}), 404
-        principal_amount = result[0]
+        if not valid_uuid(data['loan_id']):
+            return jsonify({'error': 'Invalid UUID string for loan_id'}), 400
 
-        # Calculate remaining balance
-        remaining_balance = principal_amount - data['payment_amount']
+        # Generate unique loan payment ID
+        loan_payment_id = uuid.uuid4()
+
+        with db_cursor(commit=True) as cursor:
+            # Compute the remaining balance from the loan row and insert in one statement
+            cursor.execute(_INSERT_PAYMENT_SQL, {
+                'loan_payment_id': loan_payment_id.bytes,
+                'loan_id': uuid_bytes(data['loan_id']),
+                'payment_amount': data['payment_amount'],
+            })
+
+            # No row inserted: tell a missing loan apart from an overpayment
+            if cursor.rowcount == 0:
+                cursor.execute("SELECT 1 FROM loan WHERE loan_id = %s", (uuid_bytes(data['loan_id']),))
+                if not cursor.fetchone():
+                    return jsonify({"error": "Loan not found"}), 404
+                raise BadRequest("Payment amount exceeds remaining principal.")
+        bump_cache_version('loan_payment')
+
+        return raw_json(_CREATED_PAYMENT_TMPL % str(loan_payment_id).encode(), 201)
 
-        # Ensure remaining balance is not negative
-        if remaining_balance < 0:
-            raise BadRequest("Payment amount exceeds remaining principal.")
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Generate unique loan payment ID
-        loan_payment_id = str(uuid.uuid4())
-
-        # Prepare SQL query
-        query = """
-        INSERT INTO loan_payment (loan_payment_id, loan_id, payment_date, payment_amount, remaining_balance)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        params = (
-        loan_payment_id,
-        data['loan_id'],
-        payment_date,
-        data['payment_amount'],
-        remaining_balance,
-        )
-
-        # Execute query and commit changes
-        cursor.execute(query, params)
-        connection.commit()
-
-        # Close connection and cursor
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Loan payment recorded successfully", "loan_payment_id": loan_payment_id}), 201
+# Record many loan payments in one transaction
+@loan_payment_blueprint.route('/loan_payments/batch', methods=['POST'])
+@admin_required
+def create_loan_payments_bulk():
+    """
+    Record several loan payments at once
+    ---
+    tags:
+      - Loan Payments
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            payments:
+              type: array
+              items:
+                type: object
+                properties:
+                  loan_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  payment_amount:
+                    type: number
+                    example: 1000.50
+    responses:
+      201:
+        description: Loan payments recorded successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: Loan payments recorded successfully
+            loan_payment_ids:
+              type: array
+              items:
+                type: string
+                example: 123e4567-e89b-12d3-a456-426614174005
+      400:
+        description: Validation error (e.g., missing fields or exceeding remaining balance)
+      404:
+        description: Loan not found
+      500:
+        description: Internal server error
+    """
+    data = request.get_json()
+    try:
+        payments = data.get('payments') if isinstance(data, dict) else None
+        if not isinstance(payments, list) or not payments:
+            raise BadRequest("payments must be a non-empty array")
+
+        # Validate every payment before touching the database
+        amounts = []
+        for index, payment in enumerate(payments):
+            if not isinstance(payment, dict):
+                raise BadRequest(f"Payment {index}: must be a JSON object")
+            missing_fields = [field for field in ['loan_id', 'payment_amount'] if field not in payment]
+            if missing_fields:
+                raise BadRequest(f"Payment {index}: missing required fields: {', '.join(missing_fields)}")
+            if not valid_uuid(payment['loan_id']):
+                raise BadRequest(f"Payment {index}: invalid UUID string for loan_id")
+            try:
+                payment_amount = Decimal(str(payment['payment_amount']))
+            except InvalidOperation:
+                raise BadRequest(f"Payment {index}: payment_amount must be a number")
+            if not payment_amount.is_finite() or payment_amount <= 0:
+                raise BadRequest(f"Payment {index}: payment_amount must be positive")
+            amounts.append(payment_amount)
+
+        with db_cursor(commit=True) as cursor:
+            # Every payment in the batch is stamped with the database clock
+            cursor.execute("SELECT NOW() AS now")
+            payment_date = cursor.fetchone()['now']
+
+            # Fetch the principal of every referenced loan in one query
+            loan_ids = list({uuid_bytes(payment['loan_id']) for payment in payments})
+            cursor.execute(
+                f"SELECT loan_id, principal_amount FROM loan WHERE loan_id IN ({', '.join(['%s'] * len(loan_ids))})",
+                loan_ids
+            )
+            principals = {row['loan_id']: row['principal_amount'] for row in cursor.fetchall()}
+
+            rows = []
+            for index, (payment, payment_amount) in enumerate(zip(payments, amounts)):
+                loan_id = uuid_bytes(payment['loan_id'])
+                if loan_id not in principals:
+                    return jsonify({"error": f"Payment {index}: loan not found"}), 404
+
+                # Same rule as create_loan_payment: balance is principal minus this payment
+                remaining_balance = principals[loan_id] - payment_amount
+                if remaining_balance < 0:
+                    raise BadRequest(f"Payment {index}: payment amount exceeds remaining principal.")
+
+                rows.append((uuid.uuid4().bytes, loan_id, payment_date, payment_amount, remaining_balance))
+
+            # One executemany batch; the block commits it once
+            cursor.executemany("""
+            INSERT INTO loan_payment (loan_payment_id, loan_id, payment_date, payment_amount, remaining_balance)
+            VALUES (%s, %s, %s, %s, %s)
+            """, rows)
+        bump_cache_version('loan_payment')
+
+        return jsonify({"message": "Loan payments recorded successfully", "loan_payment_ids": [str(uuid.UUID(bytes=row[0])) for row in rows]}), 201
 
     except BadRequest as e:
         return jsonify({"error": str(e)}), 400
@@ -114,47 +231,73 @@ def create_loan_payment():
 # Get all loan payments
 @loan_payment_blueprint.route('/loan_payments', methods=['GET'])
 @admin_required
+@cached_response('loan_payment')
 def get_loan_payments():
     """
     Get all loan payments
     ---
     tags:
       - Loan Payments
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        example: 100
+        description: Maximum number of loan payments to return (at most 500).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174005
+        description: Return the page following this ID (the next_cursor of the previous page).
     responses:
       200:
         description: List of all loan payments
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              loan_payment_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174005
-              loan_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174003
-              payment_date:
-                type: string
-                example: 2024-01-05T12:00:00
-              payment_amount:
-                type: number
-                example: 1000.50
-              remaining_balance:
-                type: number
-                example: 9000.50
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  loan_payment_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174005
+                  loan_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  payment_date:
+                    type: string
+                    example: 2024-01-05T12:00:00
+                  payment_amount:
+                    type: number
+                    example: 1000.50
+                  remaining_balance:
+                    type: number
+                    example: 9000.50
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174005
+              description: Pass as ?after= to fetch the next page; null on the last page
       500:
         description: Internal server error
     """
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM loan_payment")
-        loan_payments = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        limit, after = get_page_args(default_limit=100)
+        if after and not valid_uuid(after):
+            return jsonify({'error': 'Invalid UUID string for after'}), 400
 
-        return jsonify(loan_payments), 200
+        # Keyset pagination on the primary key
+        with db_cursor() as cursor:
+            after = uuid_bytes(after) if after else None
+            cursor.execute(_LIST_PAYMENTS_SQL, (after, after, limit))
+            loan_payments = cursor.fetchall()
+
+        next_cursor = loan_payments[-1]['loan_payment_id'] if len(loan_payments) == limit else None
+        return ojsonify({"items": loan_payments, "next_cursor": next_cursor})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -162,6 +305,7 @@ def get_loan_payments():
 # Get loan payments for a specific loan
 @loan_payment_blueprint.route('/loans/<loan_id>/payments', methods=['GET'])
 @admin_required
+@cached_response('loan_payment')
 def get_loan_payments_by_loan(loan_id):
     """
     Get loan payments for a specific loan
@@ -174,9 +318,16 @@ def get_loan_payments_by_loan(loan_id):
         required: true
         type: string
         example: 123e4567-e89b-12d3-a456-426614174003
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        example: 100
+        description: Maximum number of payments to return, most recent first (at most 500).
     responses:
       200:
-        description: List of payments for the specified loan
+        description: List of payments for the specified loan, most recent first
         schema:
           type: array
           items:
@@ -203,19 +354,17 @@ def get_loan_payments_by_loan(loan_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(loan_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
+        if not valid_uuid(loan_id):
+            return jsonify({'error': 'Invalid UUID string for loan_id'}), 400
+
+        limit, _ = get_page_args(default_limit=100)
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM loan_payment WHERE loan_id = %s", (loan_id,))
-        loan_payments = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        # Served as a range read of ix_loan_payment_loan_id_date
+        with db_cursor() as cursor:
+            cursor.execute(_LIST_LOAN_PAYMENTS_SQL, (uuid_bytes(loan_id), limit))
+            loan_payments = cursor.fetchall()
 
-        return jsonify(loan_payments), 200
+        return ojsonify(loan_payments)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -223,6 +372,7 @@ def get_loan_payments_by_loan(loan_id):
 # Get a specific loan payment by ID
 @loan_payment_blueprint.route('/loan_payments/<loan_payment_id>', methods=['GET'])
 @admin_required
+@cached_response('loan_payment')
 def get_loan_payment(loan_payment_id):
     """
     Get a specific loan payment by ID
@@ -262,17 +412,12 @@ def get_loan_payment(loan_payment_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(loan_payment_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM loan_payment WHERE loan_payment_id = %s", (loan_payment_id,))
-        loan_payment = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        if not valid_uuid(loan_payment_id):
+            return jsonify({'error': 'Invalid UUID string for loan_payment_id'}), 400
+
+        with db_cursor() as cursor:
+            cursor.execute(_SELECT_PAYMENT_SQL, (uuid_bytes(loan_payment_id),))
+            loan_payment = cursor.fetchone()
 
         if not loan_payment:
             return jsonify({"error": "Loan payment not found"}), 404
@@ -318,23 +463,18 @@ def delete_loan_payment(loan_payment_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(loan_payment_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for loan_id'})
+        if not valid_uuid(loan_payment_id):
+            return jsonify({'error': 'Invalid UUID string for loan_payment_id'}), 400
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM loan_payment WHERE loan_payment_id = %s", (loan_payment_id,))
-        connection.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM loan_payment WHERE loan_payment_id = %s", (uuid_bytes(loan_payment_id),))
+            found = cursor.rowcount
+        bump_cache_version('loan_payment')
 
-        if cursor.rowcount == 0:
+        if found == 0:
             return jsonify({"error": "Loan payment not found"}), 404
 
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "Loan payment deleted successfully"}), 200
+        return raw_json(_DELETED_PAYMENT_BODY)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
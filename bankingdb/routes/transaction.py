@@ -1,13 +1,166 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from werkzeug.exceptions import BadRequest
+from MySQLdb import IntegrityError, OperationalError
 import uuid
-from datetime import datetime
-from database import get_db_connection
+from database import db_cursor, get_streaming_cursor
 from .admin import admin_required
+from .utils import ojsonify, raw_json, ojsonify_stream, get_page_args, valid_uuid, uuid_bytes, cached_response, bump_cache_version
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 transaction_blueprint = Blueprint('transaction', __name__)
 
+# Columns returned by the read endpoints; transaction_id is stored as
+# BINARY(16) and returned as a UUID string
+_TRANSACTION_COLUMNS = """BIN_TO_UUID(T.transaction_id) AS transaction_id, T.from_account_id, T.to_account_id,
+    T.transaction_type, T.amount, T.transaction_timestamp"""
+
+# Listings run newest first. Timestamps can repeat, so the keyset is
+# (transaction_timestamp, transaction_id); the page cursor is the last
+# transaction_id seen, and its timestamp is looked up to resume after it.
+# Columns are qualified because the transaction_id alias shadows the
+# BINARY(16) column in ORDER BY.
+_BEFORE_CURSOR = """
+(%(ts)s IS NULL OR T.transaction_timestamp < %(ts)s
+ OR (T.transaction_timestamp = %(ts)s AND T.transaction_id < %(id)s))
+"""
+_NEWEST_FIRST = "ORDER BY T.transaction_timestamp DESC, T.transaction_id DESC LIMIT %(limit)s"
+
+_LIST_TRANSACTIONS_SQL = f"SELECT {_TRANSACTION_COLUMNS} FROM transaction T WHERE {_BEFORE_CURSOR} {_NEWEST_FIRST}"
+
+# Each branch reads at most one page from its own index before the merge.
+# The merge sorts on the UUID strings, which order the same as the bytes.
+_LIST_ACCOUNT_TRANSACTIONS_SQL = f"""
+(SELECT {_TRANSACTION_COLUMNS} FROM transaction T
+ WHERE T.from_account_id = %(account_id)s AND {_BEFORE_CURSOR}
+ {_NEWEST_FIRST})
+UNION ALL
+(SELECT {_TRANSACTION_COLUMNS} FROM transaction T
+ WHERE T.to_account_id = %(account_id)s AND T.from_account_id <> %(account_id)s AND {_BEFORE_CURSOR}
+ {_NEWEST_FIRST})
+ORDER BY transaction_timestamp DESC, transaction_id DESC LIMIT %(limit)s
+"""
+
+# Single-row statements for the by-ID endpoints
+_SELECT_TRANSACTION_SQL = f"SELECT {_TRANSACTION_COLUMNS} FROM transaction T WHERE T.transaction_id = %s"
+_DELETE_TRANSACTION_SQL = "DELETE FROM transaction WHERE transaction_id = %s"
+_CURSOR_TIMESTAMP_SQL = "SELECT transaction_timestamp FROM transaction WHERE transaction_id = %s"
+
+# Totals are maintained by triggers on transaction (see database.init_db),
+# so the report is an index range scan on total instead of an aggregate
+_HIGH_TRANSACTIONS_SQL = """
+SELECT C.customer_id, C.first_name, C.last_name, T.total AS total_transaction
+FROM customer_transaction_totals T
+JOIN customer C ON C.customer_id = T.customer_id
+WHERE T.total > %s
+"""
+
+_MONEY_TRANSFER_SQL = "CALL sp_money_transfer(%s, %s, %s, %s, %s)"
+
+# sp_money_transfer reports failures with SIGNAL SQLSTATE '45000', which the
+# server returns as error 1644 carrying the message; map each to its status
+_ER_SIGNAL_EXCEPTION = 1644
+_TRANSFER_ERROR_STATUS = {
+    'customer_id is None': 404,
+    'No customer exists with this customer_id': 404,
+    'No account exists with this account_id sender': 404,
+    'Access denied: This account is not connected with claimed customer_id': 403,
+    'No account exists with this account_id receiver': 404,
+    'Insufficient balance': 400,
+}
+
+# Idempotency-Key handling for the write endpoints: the first response for a
+# key is stored in the same database transaction as the write, so a retry
+# either finds it or the write never happened
+_ER_DUP_ENTRY = 1062
+_SELECT_IDEMPOTENT_SQL = "SELECT status_code, response_body FROM idempotency_key WHERE scope = %s AND idempotency_key = %s"
+_INSERT_IDEMPOTENT_SQL = "INSERT INTO idempotency_key (scope, idempotency_key, status_code, response_body) VALUES (%s, %s, %s, %s)"
+_PURGE_IDEMPOTENT_SQL = "DELETE FROM idempotency_key WHERE created_at < NOW() - INTERVAL 1 DAY LIMIT 100"
+
+# Read the Idempotency-Key header, if any
+def _idempotency_key():
+    key = request.headers.get('Idempotency-Key')
+    if key is not None and not 0 < len(key) <= 255:
+        raise BadRequest("Idempotency-Key must be 1 to 255 characters")
+    return key
+
+# The stored response for a key, or None the first time it is seen
+def _replayed_response(scope, key):
+    with db_cursor() as cursor:
+        cursor.execute(_SELECT_IDEMPOTENT_SQL, (scope, key))
+        row = cursor.fetchone()
+    return raw_json(row['response_body'], row['status_code']) if row else None
+
+# Store a response for its key inside the caller's write transaction. A
+# concurrent request that stored the key first makes this raise a duplicate
+# key IntegrityError, rolling the write back; answer it with _replayed_response.
+def _remember_response(cursor, scope, key, response):
+    cursor.execute(_PURGE_IDEMPOTENT_SQL)
+    cursor.execute(_INSERT_IDEMPOTENT_SQL, (scope, key, response.status_code, response.get_data()))
+
+# Read ?limit= and ?after= and resolve the cursor to its keyset position
+def _page_params(cursor):
+    limit, after = get_page_args(default_limit=100, max_limit=1000)
+    params = {'limit': limit, 'ts': None, 'id': None}
+    if after is not None:
+        if not valid_uuid(after):
+            raise BadRequest("Invalid UUID string for after")
+        params['id'] = uuid_bytes(after)
+        cursor.execute(_CURSOR_TIMESTAMP_SQL, (params['id'],))
+        row = cursor.fetchone()
+        if not row:
+            raise BadRequest("Unknown cursor for after")
+        params['ts'] = row['transaction_timestamp']
+    return params
+
+# Wrap a page of rows in the listing envelope
+def _page(transactions, limit):
+    next_cursor = transactions[-1]['transaction_id'] if len(transactions) == limit else None
+    return ojsonify({"items": transactions, "next_cursor": next_cursor})
+
+# Largest number of transactions accepted by one bulk request
+MAX_BULK_TRANSACTIONS = 1000
+
+# Shared by the single and bulk endpoints; transaction_timestamp is filled
+# in by the column default
+_INSERT_TRANSACTION_SQL = """
+INSERT INTO transaction (transaction_id, from_account_id, to_account_id, transaction_type, amount)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Checked once per transaction: set containment first, and the ordered
+# tuples only to build the error message when a check fails
+_REQUIRED_FIELDS = ('from_account_id', 'transaction_type', 'amount')
+_REQUIRED_FIELD_SET = frozenset(_REQUIRED_FIELDS)
+_TRANSACTION_TYPES = ('DEPOSIT', 'WITHDRAWAL', 'TRANSFER')
+_VALID_TRANSACTION_TYPES = frozenset(_TRANSACTION_TYPES)
+
+# Validate one transaction from a request body and return its INSERT
+# parameters, starting with a newly generated transaction_id
+def _transaction_params(data):
+    # Validate required fields
+    if not isinstance(data, dict):
+        raise BadRequest("Transaction must be a JSON object")
+    if not data.keys() >= _REQUIRED_FIELD_SET:
+        missing_fields = [field for field in _REQUIRED_FIELDS if field not in data]
+        raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
+
+    # Validate transaction type
+    if not isinstance(data['transaction_type'], str) or data['transaction_type'] not in _VALID_TRANSACTION_TYPES:
+        raise BadRequest(f"Invalid transaction type. Valid types are: {', '.join(_TRANSACTION_TYPES)}")
+
+    # Handle different transaction types
+    if data['transaction_type'] == 'TRANSFER':
+        if 'to_account_id' not in data:
+            raise BadRequest("To account ID is required for transfers.")
+
+    return (
+        uuid.uuid4().bytes,
+        data['from_account_id'],
+        data.get('to_account_id', None),  # Set to_account_id to None for deposits and withdrawals
+        data['transaction_type'],
+        data['amount'],
+    )
+
 # Create a new transaction
 @transaction_blueprint.route('/transactions', methods=['POST'])
 @admin_required
@@ -18,6 +171,11 @@ def create_transaction():
     tags:
       - Transactions
     parameters:
+      - name: Idempotency-Key
+        in: header
+        required: false
+        type: string
+        description: Retrying with the same key returns the first response instead of repeating the write.
       - name: body
         in: body
         required: true
@@ -58,118 +216,199 @@ def create_transaction():
     """
     data = request.get_json()
     try:
-        # Validate required fields
-        required_fields = ['from_account_id', 'transaction_type', 'amount']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
-
-        # Validate transaction type
-        valid_transaction_types = ['DEPOSIT', 'WITHDRAWAL', 'TRANSFER']
-        if data['transaction_type'] not in valid_transaction_types:
-            raise BadRequest(f"Invalid transaction type. Valid types are: {', '.join(valid_transaction_types)}")
-
-        # Get current timestamp
-        transaction_timestamp = datetime.now()
-
-        # Handle different transaction types
-        if data['transaction_type'] == 'TRANSFER':
-            if 'to_account_id' not in data:
-                raise BadRequest("To account ID is required for transfers.")
-
-        # Connect to database and create cursor
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        # Generate unique transaction ID
-        transaction_id = str(uuid.uuid4())
-
-        # Prepare SQL query
-        query = """
-        INSERT INTO transaction (transaction_id, from_account_id, to_account_id, transaction_type, amount, transaction_timestamp)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        params = (
-        transaction_id,
-        data['from_account_id'],
-        data.get('to_account_id', None),  # Set to_account_id to None for deposits and withdrawals
-        data['transaction_type'],
-        data['amount'],
-        transaction_timestamp,
-        )
+        # A retry of a request that already succeeded gets the same answer
+        idempotency_key = _idempotency_key()
+        if idempotency_key:
+            replayed = _replayed_response('transactions', idempotency_key)
+            if replayed:
+                return replayed
+
+        # Validate the request and build the row
+        params = _transaction_params(data)
+        transaction_id = str(uuid.UUID(bytes=params[0]))
+        response = ojsonify({"message": "Transaction created successfully", "transaction_id": transaction_id}, 201)
 
         # Execute query and commit changes
-        cursor.execute(query, params)
-        connection.commit()
-
-        # Close connection and cursor
-        cursor.close()
-        connection.close()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(_INSERT_TRANSACTION_SQL, params)
+            if idempotency_key:
+                _remember_response(cursor, 'transactions', idempotency_key, response)
+        bump_cache_version('transaction')
+
+        return response
+
+    except IntegrityError as e:
+        if idempotency_key and e.args[0] == _ER_DUP_ENTRY:
+            return _replayed_response('transactions', idempotency_key)
+        return ojsonify({"error": str(e)}, 500)
+    except BadRequest as e:
+        return ojsonify({"error": str(e)}, 400)
+    except Exception as e:
+        return ojsonify({"error": str(e)}, 500)
 
-        return jsonify({"message": "Transaction created successfully", "transaction_id": transaction_id}), 201
+# Create many transactions in one database transaction
+@transaction_blueprint.route('/transactions/bulk', methods=['POST'])
+@admin_required
+def create_transactions_bulk():
+    """
+    Create several transactions at once
+    ---
+    tags:
+      - Transactions
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            transactions:
+              type: array
+              maxItems: 1000
+              items:
+                type: object
+                properties:
+                  from_account_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174002
+                  to_account_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  amount:
+                    type: number
+                    example: 250.75
+                  transaction_type:
+                    type: string
+                    enum: [TRANSFER, WITHDRAWAL, DEPOSIT]
+                    example: TRANSFER
+    responses:
+      201:
+        description: Transactions created successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: Transactions created successfully
+            transaction_ids:
+              type: array
+              items:
+                type: string
+                example: 123e4567-e89b-12d3-a456-426614174004
+      400:
+        description: Validation error
+      500:
+        description: Internal server error
+    """
+    data = request.get_json()
+    try:
+        transactions = data.get('transactions') if isinstance(data, dict) else None
+        if not isinstance(transactions, list) or not transactions:
+            raise BadRequest("transactions must be a non-empty array")
+        if len(transactions) > MAX_BULK_TRANSACTIONS:
+            raise BadRequest(f"At most {MAX_BULK_TRANSACTIONS} transactions can be created per request")
+
+        # Validate every transaction before touching the database
+        rows = []
+        for index, transaction in enumerate(transactions):
+            try:
+                rows.append(_transaction_params(transaction))
+            except BadRequest as e:
+                raise BadRequest(f"Transaction {index}: {e.description}")
+
+        # One multi-row INSERT and a single commit for the whole batch
+        with db_cursor(commit=True) as cursor:
+            cursor.executemany(_INSERT_TRANSACTION_SQL, rows)
+        bump_cache_version('transaction')
+
+        return ojsonify({"message": "Transactions created successfully", "transaction_ids": [str(uuid.UUID(bytes=row[0])) for row in rows]}, 201)
 
     except BadRequest as e:
-        return jsonify({"error": str(e)}), 400
+        return ojsonify({"error": str(e)}, 400)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 # Get all transactions
 @transaction_blueprint.route('/transactions', methods=['GET'])
 @admin_required
 def get_transactions():
     """
-    Get all transactions
+    Get all transactions, newest first
     ---
     tags:
       - Transactions
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        example: 100
+        description: Maximum number of transactions to return (at most 1000).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174004
+        description: Return the page following this ID (the next_cursor of the previous page).
     responses:
       200:
         description: List of transactions
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              transaction_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174004
-              sender_account_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174002
-              receiver_account_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174003
-              amount:
-                type: number
-                example: 250.75
-              transaction_type:
-                type: string
-                example: TRANSFER
-              transaction_date:
-                type: string
-                example: 2024-01-05T12:00:00
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  transaction_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174004
+                  sender_account_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174002
+                  receiver_account_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  amount:
+                    type: number
+                    example: 250.75
+                  transaction_type:
+                    type: string
+                    example: TRANSFER
+                  transaction_date:
+                    type: string
+                    example: 2024-01-05T12:00:00
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174004
+              description: Pass as ?after= to fetch the next page; null on the last page
       500:
         description: Internal server error
     """
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM transaction")
-        transactions = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        with db_cursor() as cursor:
+            params = _page_params(cursor)
 
-        return jsonify(transactions), 200
+        # Rows are encoded and sent as they arrive from the server
+        # instead of being collected into one list first
+        cursor = get_streaming_cursor()
+        cursor.execute(_LIST_TRANSACTIONS_SQL, params)
 
+        return ojsonify_stream(cursor, cursor_key='transaction_id', limit=params['limit'])
+
+    except BadRequest as e:
+        return ojsonify({"error": str(e)}, 400)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 # Get transactions for a specific account
 @transaction_blueprint.route('/accounts/<account_id>/transactions', methods=['GET'])
 @admin_required
 def get_account_transactions(account_id):
     """
-    Get all transactions for a specific account
+    Get all transactions for a specific account, newest first
     ---
     tags:
       - Transactions
@@ -179,57 +418,75 @@ def get_account_transactions(account_id):
         required: true
         type: string
         example: 123e4567-e89b-12d3-a456-426614174002
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 100
+        example: 100
+        description: Maximum number of transactions to return (at most 1000).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174004
+        description: Return the page following this ID (the next_cursor of the previous page).
     responses:
       200:
         description: List of transactions for the account
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              transaction_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174004
-              sender_account_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174002
-              receiver_account_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174003
-              amount:
-                type: number
-                example: 250.75
-              transaction_type:
-                type: string
-                example: TRANSFER
-              transaction_date:
-                type: string
-                example: 2024-01-05T12:00:00
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  transaction_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174004
+                  sender_account_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174002
+                  receiver_account_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174003
+                  amount:
+                    type: number
+                    example: 250.75
+                  transaction_type:
+                    type: string
+                    example: TRANSFER
+                  transaction_date:
+                    type: string
+                    example: 2024-01-05T12:00:00
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174004
+              description: Pass as ?after= to fetch the next page; null on the last page
       404:
         description: Account not found
       500:
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(account_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for account_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("""
-        SELECT * FROM transaction 
-        WHERE from_account_id = %s OR to_account_id = %s
-        """, (account_id, account_id))
-        transactions = cursor.fetchall()
-        cursor.close()
-        connection.close()
-
-        return jsonify(transactions), 200
+        if not valid_uuid(account_id):
+            return ojsonify({'error': 'Invalid UUID string for account_id'}, 400)
 
+        with db_cursor() as cursor:
+            params = _page_params(cursor)
+            params['account_id'] = account_id
+            # One index range scan per side instead of a table scan for the OR;
+            # the second branch skips transfers to self, which the first returns
+            cursor.execute(_LIST_ACCOUNT_TRANSACTIONS_SQL, params)
+            transactions = cursor.fetchall()
+
+        return _page(transactions, params['limit'])
+
+    except BadRequest as e:
+        return ojsonify({"error": str(e)}, 400)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 # Get a specific transaction by ID
 @transaction_blueprint.route('/transactions/<transaction_id>', methods=['GET'])
@@ -276,25 +533,20 @@ def get_transaction(transaction_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(transaction_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for transaction_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM transaction WHERE transaction_id = %s", (transaction_id,))
-        transaction = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        if not valid_uuid(transaction_id):
+            return ojsonify({'error': 'Invalid UUID string for transaction_id'}, 400)
+
+        with db_cursor() as cursor:
+            cursor.execute(_SELECT_TRANSACTION_SQL, (uuid_bytes(transaction_id),))
+            transaction = cursor.fetchone()
 
         if not transaction:
-            return jsonify({"error": "Transaction not found"}), 404
+            return ojsonify({"error": "Transaction not found"}, 404)
 
-        return jsonify(transaction), 200
+        return ojsonify(transaction)
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 
 @transaction_blueprint.route('/transactions/<transaction_id>', methods=['DELETE'])
@@ -328,26 +580,21 @@ def delete_transaction(transaction_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(transaction_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for transaction_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM transaction WHERE transaction_id = %s", (transaction_id,))
-        connection.commit()
+        if not valid_uuid(transaction_id):
+            return ojsonify({'error': 'Invalid UUID string for transaction_id'}, 400)
 
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Transaction not found"}), 404
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(_DELETE_TRANSACTION_SQL, (uuid_bytes(transaction_id),))
+            deleted = cursor.rowcount
+        bump_cache_version('transaction')
 
-        cursor.close()
-        connection.close()
+        if deleted == 0:
+            return ojsonify({"error": "Transaction not found"}, 404)
 
-        return jsonify({"message": "Transaction deleted successfully"}), 200
+        return ojsonify({"message": "Transaction deleted successfully"})
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
     
 def get_customers_with_high_transactions(min_transaction_total):
     """
@@ -387,37 +634,20 @@ def get_customers_with_high_transactions(min_transaction_total):
       500:
         description: Internal server error
     """
-    connection = None
-    cursor = None
-
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-        SELECT C.customer_id, C.first_name, C.last_name, SUM(T.amount) AS total_transaction
-        FROM customer C
-        JOIN account A ON C.customer_id = A.customer_id
-        JOIN transaction T ON A.account_id = T.from_account_id OR A.account_id = T.to_account_id
-        GROUP BY C.customer_id, C.first_name, C.last_name
-        HAVING SUM(T.amount) > %s;
-        """
-        cursor.execute(query, (min_transaction_total,))
-        results = cursor.fetchall()
-        return results
+        with db_cursor() as cursor:
+            cursor.execute(_HIGH_TRANSACTIONS_SQL, (min_transaction_total,))
+            return cursor.fetchall()
 
     except Exception as e:
         raise RuntimeError(f"Database query failed: {str(e)}")
 
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-
 
 @transaction_blueprint.route('/high_transactions', methods=['GET'])
 @admin_required
+# The aggregate only changes when transactions are written, and every write
+# path bumps the 'transaction' version; the TTL bounds staleness in other workers
+@cached_response('transaction', ttl=60)
 def api_customers_high_transactions():
     """
     Fetch customers with high transaction totals
@@ -461,14 +691,14 @@ def api_customers_high_transactions():
     try:
         results = get_customers_with_high_transactions(min_transaction_total)
         if not results:
-            return jsonify({'message': 'No customers found with transactions exceeding the specified amount.'}), 404
-        return jsonify(results), 200
+            return ojsonify({'message': 'No customers found with transactions exceeding the specified amount.'}, 404)
+        return ojsonify(results)
 
     except RuntimeError as e:
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}, 500)
 
     except Exception as e:
-        return jsonify({'error': 'An unexpected error occurred.', 'details': str(e)}), 500
+        return ojsonify({'error': 'An unexpected error occurred.', 'details': str(e)}, 500)
 
 @transaction_blueprint.route('/money_transfer', methods=['POST'])
 @jwt_required()
@@ -479,6 +709,11 @@ def money_transfer():
     tags:
       - Transactions
     parameters:
+      - name: Idempotency-Key
+        in: header
+        required: false
+        type: string
+        description: Retrying with the same key returns the first response instead of repeating the write.
       - name: body
         in: body
         required: true
@@ -529,81 +764,65 @@ def money_transfer():
     """
     user_id = get_jwt_identity()
 
-    connection = get_db_connection()
-    cursor = connection.cursor()
+    # A retry of a transfer that already succeeded gets the same answer
+    idempotency_key = _idempotency_key()
+    idempotency_scope = f"money_transfer:{user_id}"
+    if idempotency_key:
+        replayed = _replayed_response(idempotency_scope, idempotency_key)
+        if replayed:
+            return replayed
+
+    data = request.get_json()
+    sender_account_id = data.get('sender_account_id')
+    receiver_account_id = data.get('receiver_account_id')
+    amount = data.get('amount')
+
+    if not sender_account_id or not receiver_account_id or not amount:
+        return ojsonify({'error': 'All fields are required: sender_account_id, receiver_account_id, amount'}, 400)
+
+    if not valid_uuid(sender_account_id) or not valid_uuid(receiver_account_id):
+        return ojsonify({'error': 'Invalid UUID format'}, 400)
+
+    if amount <= 0:
+        return ojsonify({'error': 'Amount must be greater than 0'}, 400)
 
     try:
-        cursor.execute("SELECT customer_id FROM user WHERE user_id = %s", (user_id,))
-        customer_id_row = cursor.fetchone()
-        if not customer_id_row:
-            return jsonify({'error': 'customer_id is None'}), 404
-        customer_id = customer_id_row['customer_id']
-
-        cursor.execute("SELECT * FROM customer WHERE customer_id = %s", (customer_id,))
-        sender_customer = cursor.fetchone()
-        if not sender_customer:
-            return jsonify({'error': 'No customer exists with this customer_id'}), 404
-
-        data = request.get_json()
-        sender_account_id = data.get('sender_account_id')
-        receiver_account_id = data.get('receiver_account_id')
-        amount = data.get('amount')
-
-        if not sender_account_id or not receiver_account_id or not amount:
-            return jsonify({'error': 'All fields are required: sender_account_id, receiver_account_id, amount'}), 400
-
-        try:
-            uuid.UUID(sender_account_id)
-            uuid.UUID(receiver_account_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID format'}), 400
-
-        if amount <= 0:
-            return jsonify({'error': 'Amount must be greater than 0'}), 400
-
-        cursor.execute("SELECT * FROM account WHERE account_id = %s", (sender_account_id,))
-        sender_account = cursor.fetchone()
-        if not sender_account:
-            return jsonify({'error': 'No account exists with this account_id sender'}), 404
-
-        if sender_account['customer_id'] != customer_id:
-            return jsonify({'error': 'Access denied: This account is not connected with claimed customer_id'}), 403
-
-        cursor.execute("SELECT * FROM account WHERE account_id = %s", (receiver_account_id,))
-        receiver_account = cursor.fetchone()
-        if not receiver_account:
-            return jsonify({'error': 'No account exists with this account_id receiver'}), 404
-
-        if sender_account['balance'] < amount:
-            return jsonify({'error': 'Insufficient balance'}), 400
-
-        cursor.execute("UPDATE account SET balance = balance - %s WHERE account_id = %s", (amount, sender_account_id))
-        cursor.execute("UPDATE account SET balance = balance + %s WHERE account_id = %s", (amount, receiver_account_id))
-
-        transaction_timestamp = datetime.now()
-        cursor.execute("""
-            INSERT INTO Transaction (
-                from_account_id, to_account_id, transaction_type, amount, transaction_timestamp
-            ) VALUES (
-                %s, %s, %s, %s, %s
-            )
-        """, (sender_account_id, receiver_account_id, 'TRANSFER', amount, transaction_timestamp))
-
-        connection.commit()
-
-        return jsonify({
-            'message': 'Money transfer is successful',
-            'sender_account_id': sender_account_id,
-            'receiver_account_id': receiver_account_id,
-            'transaction_type': 'TRANSFER',
-            'amount': amount,
-            'transaction_timestamp': transaction_timestamp.strftime('%Y-%m-%d %H:%M:%S')
-        }), 201
+        # The whole transfer runs server-side in one round trip; see
+        # sp_money_transfer in database.init_db. db_cursor rolls back
+        # before any error reaches the handlers below.
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(_MONEY_TRANSFER_SQL, (
+                user_id, sender_account_id, receiver_account_id, amount, uuid.uuid4().bytes
+            ))
+            transaction_timestamp = cursor.fetchone()['transaction_timestamp']
+            # Drain the CALL's trailing status result before the next statement
+            while cursor.nextset():
+                pass
+
+            response = ojsonify({
+                'message': 'Money transfer is successful',
+                'sender_account_id': sender_account_id,
+                'receiver_account_id': receiver_account_id,
+                'transaction_type': 'TRANSFER',
+                'amount': amount,
+                'transaction_timestamp': transaction_timestamp.strftime('%Y-%m-%d %H:%M:%S')
+            }, 201)
+            if idempotency_key:
+                _remember_response(cursor, idempotency_scope, idempotency_key, response)
+        bump_cache_version('transaction')
+
+        return response
+
+    except IntegrityError as e:
+        if idempotency_key and e.args[0] == _ER_DUP_ENTRY:
+            return _replayed_response(idempotency_scope, idempotency_key)
+        return ojsonify({'error': str(e)}, 500)
+
+    except OperationalError as e:
+        if e.args[0] != _ER_SIGNAL_EXCEPTION:
+            return ojsonify({'error': str(e)}, 500)
+        message = e.args[1]
+        return ojsonify({'error': message}, _TRANSFER_ERROR_STATUS.get(message, 400))
 
     except Exception as e:
-        connection.rollback()
-        return jsonify({'error': str(e)}), 500
-
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+        return ojsonify({'error': str(e)}, 500)
\ No newline at end of file
@@ -1,11 +1,43 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash
 import uuid
-from database import get_db_connection
+from MySQLdb import IntegrityError
+from database import db_cursor
 from .admin import admin_required
+from .utils import hash_password, hash_passwords, cached_response, bump_cache_version, ojsonify, get_page_args, valid_uuid, uuid_bytes
 
 user_blueprint = Blueprint('user', __name__)
 
+# Columns returned by the read endpoints; user_id is stored as BINARY(16)
+# and returned as a UUID string
+_USER_COLUMNS = "BIN_TO_UUID(U.user_id) AS user_id, U.username, U.role, U.customer_id"
+
+# Statements (see the note in database.py)
+_LIST_USERS_SQL = f"SELECT {_USER_COLUMNS} FROM user U ORDER BY U.user_id LIMIT %s"
+_LIST_USERS_AFTER_SQL = f"SELECT {_USER_COLUMNS} FROM user U WHERE U.user_id > %s ORDER BY U.user_id LIMIT %s"
+_SELECT_USER_SQL = f"SELECT {_USER_COLUMNS} FROM user U WHERE U.user_id = %s"
+_DELETE_USER_SQL = "DELETE FROM user WHERE user_id = %s"
+
+# MySQL error number for a duplicate key
+_ER_DUP_ENTRY = 1062
+
+# Cheap existence check on the UNIQUE username index
+_USERNAME_TAKEN_SQL = "SELECT 1 FROM user WHERE username = %s LIMIT 1"
+
+# Largest number of users accepted by one bulk request
+MAX_BULK_USERS = 1000
+
+# Batched by executemany in create_users_bulk
+_INSERT_USER_SQL = """
+INSERT INTO user (user_id, username, password, role, customer_id)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Columns update_user may change, in the order of _UPDATE_USER's parameters
+_UPDATE_FIELDS = ('username', 'password', 'role', 'customer_id')
+_UPDATE_USER = "UPDATE user SET " + ", ".join(
+    f"{field} = COALESCE(%s, {field})" for field in _UPDATE_FIELDS
+) + " WHERE user_id = %s"
+
 # create a new user
 @user_blueprint.route('/users', methods=['POST'])
 def create_user():
@@ -48,10 +80,12 @@ def create_user():
               example: 123e4567-e89b-12d3-a456-426614174000
       400:
         description: Validation error
+      409:
+        description: Username already exists
       500:
         description: Internal server error
     """
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     try:
         username = data.get('username')
         password = data.get('password')
@@ -64,27 +98,122 @@ def create_user():
         if role not in ['ADMIN', 'USER']:
             return jsonify({"error": "Invalid role specified"}), 400
 
-        hashed_password = generate_password_hash(password)
-        user_id = str(uuid.uuid4())
-        
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute(
-            """INSERT INTO user (user_id, username, password, role, customer_id)
-            VALUES (%s, %s, %s, %s, %s)""",
-            (user_id, username, hashed_password, role, customer_id)
-        )
-        connection.commit()
-        cursor.close()
-        connection.close()
-
-        return jsonify({"message": "User created successfully", "user_id": user_id}), 201
+        # Turn away taken usernames before paying for the password hash
+        with db_cursor() as cursor:
+            cursor.execute(_USERNAME_TAKEN_SQL, (username,))
+            taken = cursor.fetchone()
+        if taken:
+            return jsonify({"error": "Username already exists"}), 409
+
+        hashed_password = hash_password(password)
+        user_id = uuid.uuid4()
+
+        # The UNIQUE index still settles a race between two requests
+        try:
+            with db_cursor(commit=True) as cursor:
+                cursor.execute(_INSERT_USER_SQL, (user_id.bytes, username, hashed_password, role, customer_id))
+        except IntegrityError as e:
+            if e.args[0] == _ER_DUP_ENTRY:
+                return jsonify({"error": "Username already exists"}), 409
+            raise
+        bump_cache_version('user')
+
+        return jsonify({"message": "User created successfully", "user_id": str(user_id)}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# create several users at once
+@user_blueprint.route('/users/bulk', methods=['POST'])
+@admin_required
+def create_users_bulk():
+    """
+    Create several users at once
+    ---
+    tags:
+      - Users
+    security:
+      - BearerAuth: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            users:
+              type: array
+              maxItems: 1000
+              items:
+                type: object
+                properties:
+                  username:
+                    type: string
+                    example: john_doe
+                  password:
+                    type: string
+                    example: my_secure_password
+                  role:
+                    type: string
+                    enum: [ADMIN, USER]
+                    example: USER
+                  customer_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174000
+    responses:
+      201:
+        description: Users created successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: Users created successfully
+            user_ids:
+              type: array
+              items:
+                type: string
+                example: 123e4567-e89b-12d3-a456-426614174000
+      400:
+        description: Validation error
+      403:
+        description: Access forbidden (Admin only)
+      500:
+        description: Internal server error
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        users = data.get('users') if isinstance(data, dict) else None
+        if not isinstance(users, list) or not users:
+            return jsonify({"error": "users must be a non-empty array"}), 400
+        if len(users) > MAX_BULK_USERS:
+            return jsonify({"error": f"At most {MAX_BULK_USERS} users can be created per request"}), 400
+
+        # Validate every user before hashing anything
+        for index, user in enumerate(users):
+            if not isinstance(user, dict) or not user.get('username') or not user.get('password'):
+                return jsonify({"error": f"User {index}: Username and password are required"}), 400
+            if user.get('role', 'USER') not in ['ADMIN', 'USER']:
+                return jsonify({"error": f"User {index}: Invalid role specified"}), 400
+
+        # Hash on the shared pool, then one multi-row INSERT and a single commit
+        hashed_passwords = hash_passwords([user['password'] for user in users])
+        rows = [
+            (uuid.uuid4().bytes, user['username'], hashed_password, user.get('role', 'USER'), user.get('customer_id'))
+            for user, hashed_password in zip(users, hashed_passwords)
+        ]
+
+        with db_cursor(commit=True) as cursor:
+            cursor.executemany(_INSERT_USER_SQL, rows)
+        bump_cache_version('user')
+
+        return jsonify({"message": "Users created successfully", "user_ids": [str(uuid.UUID(bytes=row[0])) for row in rows]}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # get all users
 @user_blueprint.route('/users', methods=['GET'])
 @admin_required
+@cached_response('user')
 def get_users():
     """
     Get all users
@@ -93,47 +222,76 @@ def get_users():
       - Users
     security:
       - BearerAuth: []
+    parameters:
+      - name: limit
+        in: query
+        required: false
+        type: integer
+        default: 50
+        example: 50
+        description: Maximum number of users to return (at most 500).
+      - name: after
+        in: query
+        required: false
+        type: string
+        example: 123e4567-e89b-12d3-a456-426614174000
+        description: Return the page following this ID (the next_cursor of the previous page).
     responses:
       200:
         description: List of users
         schema:
-          type: array
-          items:
-            type: object
-            properties:
-              user_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174000
-              username:
-                type: string
-                example: john_doe
-              role:
-                type: string
-                enum: [ADMIN, USER]
-                example: USER
-              customer_id:
-                type: string
-                example: 123e4567-e89b-12d3-a456-426614174000
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  user_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174000
+                  username:
+                    type: string
+                    example: john_doe
+                  role:
+                    type: string
+                    enum: [ADMIN, USER]
+                    example: USER
+                  customer_id:
+                    type: string
+                    example: 123e4567-e89b-12d3-a456-426614174000
+            next_cursor:
+              type: string
+              example: 123e4567-e89b-12d3-a456-426614174000
+              description: Pass as ?after= to fetch the next page; null on the last page
       403:
         description: Access forbidden (Admin only)
       500:
         description: Internal server error
     """
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT user_id, username, role, customer_id FROM user")
-        users = cursor.fetchall()
-        cursor.close()
-        connection.close()
-
-        return jsonify(users), 200
+        limit, after = get_page_args()
+        if after and not valid_uuid(after):
+            return jsonify({'error': 'Invalid UUID string for after'}), 400
+
+        # Keyset page on the primary key. A page is at most 500 rows, so it is
+        # fetched whole; cached_response keeps the encoded body anyway.
+        with db_cursor() as cursor:
+            if after:
+                cursor.execute(_LIST_USERS_AFTER_SQL, (uuid_bytes(after), limit))
+            else:
+                cursor.execute(_LIST_USERS_SQL, (limit,))
+            users = cursor.fetchall()
+
+        next_cursor = users[-1]['user_id'] if len(users) == limit else None
+        return ojsonify({'items': users, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # get a specific user by ID
 @user_blueprint.route('/users/<user_id>', methods=['GET'])
 @admin_required
+@cached_response('user')
 def get_user(user_id):
     """
     Get a specific user by ID
@@ -174,17 +332,12 @@ def get_user(user_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(user_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for user_id'})
+        if not valid_uuid(user_id):
+            return jsonify({'error': 'Invalid UUID string for user_id'}), 400
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("SELECT user_id, username, role, customer_id FROM user WHERE user_id = %s", (user_id,))
-        user = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with db_cursor() as cursor:
+            cursor.execute(_SELECT_USER_SQL, (uuid_bytes(user_id),))
+            user = cursor.fetchone()
 
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -247,48 +400,30 @@ def update_user(user_id):
       500:
         description: Internal server error
     """
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     try:
-        try:
-            uuid.UUID(user_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for user_id'})
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        if not valid_uuid(user_id):
+            return jsonify({'error': 'Invalid UUID string for user_id'}), 400
 
-        updates = []
-        params = []
-
-        if 'username' in data:
-            updates.append("username = %s")
-            params.append(data['username'])
-
-        if 'password' in data:
-            updates.append("password = %s")
-            params.append(generate_password_hash(data['password']))
-
-        if 'role' in data and data['role'] in ['ADMIN', 'USER']:
-            updates.append("role = %s")
-            params.append(data['role'])
-
-        if 'customer_id' in data:
-            updates.append("customer_id = %s")
-            params.append(data['customer_id'])
-
-        if not updates:
+        # One fixed statement; fields missing from the body are passed as
+        # NULL and COALESCE keeps the stored value
+        params = [data.get(field) for field in _UPDATE_FIELDS]
+        if params[_UPDATE_FIELDS.index('role')] not in ('ADMIN', 'USER'):
+            params[_UPDATE_FIELDS.index('role')] = None
+        if all(value is None for value in params):
             return jsonify({"error": "No valid fields to update"}), 400
 
-        params.append(user_id)
-        query = f"UPDATE user SET {', '.join(updates)} WHERE user_id = %s"
-        cursor.execute(query, tuple(params))
-        connection.commit()
+        if data.get('password') is not None:
+            params[_UPDATE_FIELDS.index('password')] = hash_password(data['password'])
 
-        if cursor.rowcount == 0:
-            return jsonify({"error": "User not found"}), 404
+        params.append(uuid_bytes(user_id))
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(_UPDATE_USER, tuple(params))
+            found = cursor.rowcount
+        bump_cache_version('user')
 
-        cursor.close()
-        connection.close()
+        if found == 0:
+            return jsonify({"error": "User not found"}), 404
 
         return jsonify({"message": "User updated successfully"}), 200
     except Exception as e:
@@ -322,22 +457,17 @@ def delete_user(user_id):
         description: Internal server error
     """
     try:
-        try:
-            uuid.UUID(user_id)
-        except ValueError:
-            return jsonify({'error': 'Invalid UUID string for user_id'})
+        if not valid_uuid(user_id):
+            return jsonify({'error': 'Invalid UUID string for user_id'}), 400
 
-        connection = get_db_connection()
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM user WHERE user_id = %s", (user_id,))
-        connection.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute(_DELETE_USER_SQL, (uuid_bytes(user_id),))
+            found = cursor.rowcount
+        bump_cache_version('user')
 
-        if cursor.rowcount == 0:
+        if found == 0:
             return jsonify({"error": "User not found"}), 404
 
-        cursor.close()
-        connection.close()
-
         return jsonify({"message": "User deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,183 @@
+from decimal import Decimal
+from functools import wraps
+import hashlib, os, re, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, make_response, request, stream_with_context
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import BadRequest
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+import orjson
+
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+
+# orjson handles datetime, date and UUID natively; DECIMAL columns are
+# emitted as strings, matching what Flask's default provider produced
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError
+
+# Flask JSON provider backed by orjson, installed as app.json so jsonify and
+# request.get_json skip the stdlib json module
+class ORJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS),
+            mimetype='application/json'
+        )
+
+# Serialize with orjson directly, without going through the app's provider
+def ojsonify(obj, status=200):
+    return Response(
+        orjson.dumps(obj, default=_default),
+        status=status,
+        mimetype='application/json'
+    )
+
+# Respond with an already-encoded JSON body, for fixed-shape responses whose
+# bytes are prepared ahead of time
+def raw_json(body, status=200):
+    return Response(body, status=status, mimetype='application/json')
+
+# Stream the rows of an executed server-side cursor as a JSON array, so
+# memory stays bounded by batch_size instead of the size of the table.
+# The cursor is closed once the generator is exhausted; stream_with_context
+# keeps the request's connection open until then.
+# With cursor_key set, the array is wrapped in the {items, next_cursor}
+# envelope: next_cursor is the last row's cursor_key when the page is full.
+def ojsonify_stream(cursor, batch_size=1000, cursor_key=None, limit=None):
+    def generate():
+        try:
+            yield b'{"items":[' if cursor_key else b'['
+            separator = b''
+            count, last = 0, None
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                yield separator + b','.join(orjson.dumps(row, default=_default) for row in rows)
+                separator = b','
+                count, last = count + len(rows), rows[-1]
+                rows = cursor.fetchmany(batch_size)
+            if cursor_key:
+                next_cursor = last[cursor_key] if count == limit else None
+                yield b'],"next_cursor":' + orjson.dumps(next_cursor, default=_default) + b'}'
+            else:
+                yield b']'
+        finally:
+            cursor.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# Read the keyset pagination query parameters: ?limit=<n>&after=<last id seen>
+def get_page_args(default_limit=50, max_limit=500):
+    limit = request.args.get('limit', default=default_limit, type=int)
+    limit = max(1, min(limit, max_limit))
+    return limit, request.args.get('after')
+
+# Check the canonical 8-4-4-4-12 UUID form without building a uuid.UUID
+def valid_uuid(value):
+    return isinstance(value, str) and _UUID_RE.match(value) is not None
+
+# 16-byte form of a validated UUID string, for BINARY(16) key columns
+def uuid_bytes(value):
+    return bytes.fromhex(value.replace('-', ''))
+
+# Raise BadRequest unless data is a JSON object containing every required field
+def require_fields(data, required_fields):
+    if not isinstance(data, dict):
+        raise BadRequest("Request body must be a JSON object")
+    missing_fields = [field for field in required_fields if field not in data]
+    if missing_fields:
+        raise BadRequest(f"Missing required fields: {', '.join(missing_fields)}")
+
+# Password hashing and checking run on a small shared pool. argon2's C core
+# runs with the GIL released, so other request threads keep running, and at
+# most this many KDFs burn CPU at once however many logins arrive together.
+_password_executor = ThreadPoolExecutor(
+    max_workers=max(1, (os.cpu_count() or 2) // 2),
+    thread_name_prefix='password-hash'
+)
+
+# Argon2id with OWASP's 19 MiB / 2 pass / 1 lane profile. Being memory-hard,
+# it holds up against GPU cracking at far less CPU per login than PBKDF2.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Hash a password on the pool
+def hash_password(password):
+    return _password_executor.submit(_password_hasher.hash, password).result()
+
+# Hash a batch of passwords, spread across the pool's workers
+def hash_passwords(passwords):
+    return list(_password_executor.map(_password_hasher.hash, passwords))
+
+# Check a password against an argon2 hash, or a werkzeug one stored before
+# the switch to argon2
+def _check_password(pwhash, password):
+    if not pwhash.startswith('$argon2'):
+        return check_password_hash(pwhash, password)
+    try:
+        return _password_hasher.verify(pwhash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+# _check_password on the same pool
+def verify_password(pwhash, password):
+    return _password_executor.submit(_check_password, pwhash, password).result()
+
+# True for werkzeug hashes and argon2 hashes made with other parameters, so
+# login can upgrade them while the plaintext is at hand
+def password_needs_rehash(pwhash):
+    return not pwhash.startswith('$argon2') or _password_hasher.check_needs_rehash(pwhash)
+
+# In-process cache of successful GET responses, keyed by namespace version and
+# full request path. Writers call bump_cache_version(namespace) so entries
+# cached before the change are never served again; the TTL bounds how stale
+# another worker process's copy can be.
+_response_cache = {}
+_cache_versions = {}
+_cache_lock = threading.Lock()
+
+def bump_cache_version(namespace):
+    with _cache_lock:
+        _cache_versions[namespace] = _cache_versions.get(namespace, 0) + 1
+
+# Serve a view from the cache for ttl seconds and tag it with an ETag, answering
+# 304 Not Modified when the client already holds the same body
+def cached_response(namespace, ttl=5, maxsize=1024):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (namespace, _cache_versions.get(namespace, 0), request.full_path)
+            now = time.monotonic()
+            entry = _response_cache.get(key)
+
+            if entry is None or entry[0] <= now:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+                body = response.get_data()
+                entry = (now + ttl, body, hashlib.blake2b(body, digest_size=16).hexdigest())
+                with _cache_lock:
+                    if len(_response_cache) >= maxsize:
+                        _response_cache.clear()
+                    _response_cache[key] = entry
+
+            _, body, etag = entry
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            return response
+
+        return wrapper
+    return decorator
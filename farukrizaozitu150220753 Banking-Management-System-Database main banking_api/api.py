@@ -1,20 +1,113 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, make_response
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
+import hashlib
 import json
-from sqlalchemy import text
+import os
+import orjson
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import Integer, Numeric, bindparam, delete, event, inspect, select, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.dialects.mysql import BINARY
-from flask_restful import Resource, Api, reqparse, fields, marshal_with, abort
+from flask_restful import Resource, Api, reqparse, fields, marshal, marshal_with, abort
 import re
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.routing import BaseConverter
+from werkzeug.security import check_password_hash
+from werkzeug.http import http_date
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from hmac import compare_digest
 
 app = Flask(__name__)
+
+class UUIDBytesConverter(BaseConverter):
+    """
+    URL converter for canonical UUIDs that hands views the 16 bytes stored in BINARY(16) keys.
+    """
+    regex = r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+
+    def to_python(self, value):
+        return bytes.fromhex(value.replace('-', ''))
+
+    def to_url(self, value):
+        return str(uuid.UUID(bytes=value))
+
+app.url_map.converters['uuidb'] = UUIDBytesConverter
+
+def json_default(value):
+    """
+    Encode values orjson has no native form for.
+
+    :param value: The value orjson could not serialize.
+    :return: The UUID string for 16-byte keys, str(value) for anything else (e.g. Decimal).
+    """
+    if isinstance(value, bytes) and len(value) == 16:
+        return str(uuid.UUID(bytes=value))
+    return str(value)
+
+class ORJSONProvider(JSONProvider):
+    """
+    JSON provider backed by orjson, so jsonify and request.get_json skip the stdlib json module.
+    """
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=json_default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=json_default), mimetype='application/json')
+
+app.json = ORJSONProvider(app)
+
+# Brotli or gzip for JSON bodies over 500 bytes, whichever the client accepts
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 500
+Compress(app)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///banking_management.db'
+# Keep enough open connections for every request thread, and wait up to 5s
+# for a write lock instead of failing at once with "database is locked"
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 20,
+    'max_overflow': 40,
+    'connect_args': {'timeout': 5}
+}
 db = SQLAlchemy(app)
+
+with app.app_context():
+    @event.listens_for(db.engine, 'connect')
+    def configure_sqlite_connection(dbapi_connection, _connection_record):
+        # WAL lets readers run alongside a writer, and NORMAL syncs only at
+        # checkpoints instead of on every commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
 api = Api(app)
+
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """
+    Serialize resource responses with orjson instead of the stdlib json module.
+
+    :param data: The (already marshalled) response body.
+    :param code: The HTTP status code.
+    :param headers: Extra response headers, if any.
+    :return: A JSON response.
+    """
+    response = make_response(orjson.dumps(data, default=json_default), code)
+    response.mimetype = 'application/json'
+    response.headers.extend(headers or {})
+    return response
 app.config['JWT_SECRET_KEY'] = 'super_secret_key'
 jwt = JWTManager(app)
 
@@ -30,20 +123,46 @@ def protected():
 def user_identity_lookup(user):
     return user
 
+# Users loaded for JWT-protected requests, keyed by binary user_id and kept
+# for USER_CACHE_TTL seconds so most requests skip the lookup query.
+# UserResource.put/delete drop an entry as soon as the user changes.
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 10000
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+def forget_cached_user(user_id_binary):
+    with _user_cache_lock:
+        _user_cache.pop(user_id_binary, None)
+
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
     identity = jwt_data["sub"] 
     user_id_uuid = uuid.UUID(hex=identity)
     user_id_binary = user_id_uuid.bytes 
-    return User.query.filter_by(user_id=user_id_binary).one_or_none() 
+    now = time.monotonic()
+    entry = _user_cache.get(user_id_binary)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    user = db.session.get(User, user_id_binary)
+    if user is not None:
+        # Detach it so a later commit cannot expire the cached copy
+        db.session.expunge(user)
+    with _user_cache_lock:
+        if len(_user_cache) >= USER_CACHE_SIZE:
+            _user_cache.clear()
+        _user_cache[user_id_binary] = (now + USER_CACHE_TTL, user)
+    return user
     
-from functools import wraps
+from functools import lru_cache, wraps
 
 def admin_required(fn):
     @wraps(fn)  # Preserve the original function name
     @jwt_required()
     def wrapper(*args, **kwargs):
-        claims = get_jwt()
+        # Kept on g so the view reads the verified claims without asking again
+        claims = g.jwt_claims = get_jwt()
         if claims.get('role') != 'ADMIN':
             return jsonify({'error': 'Admin access required'}), 403
         return fn(*args, **kwargs)
@@ -53,7 +172,8 @@ def user_or_admin_required(fn):
     @wraps(fn)  # Preserve the original function name
     @jwt_required()
     def wrapper(*args, **kwargs):
-        claims = get_jwt()
+        # Kept on g so the view reads the verified claims without asking again
+        claims = g.jwt_claims = get_jwt()
         if 'role' not in claims or claims['role'] not in ['ADMIN', 'USER']:
             return jsonify({'error': 'Access denied'}), 403
         return fn(*args, **kwargs)
@@ -66,7 +186,65 @@ def admin_only():
     return jsonify({'message': 'Welcome, Admin!'}), 200
 
 def generate_uuid():
-    return uuid.uuid4().bytes
+    """
+    New 16-byte key in UUIDv7 layout: a 48-bit millisecond timestamp, then random bits.
+
+    Keys from successive inserts sort in time order, so new rows land at the right
+    edge of the primary key index instead of splitting pages across it.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76   # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62   # RFC 4122 variant
+    return value.to_bytes(16, 'big')
+
+# Password hashing runs on a small shared pool. argon2's C core runs with
+# the GIL released, so other request threads keep running while a hash is
+# computed, and at most this many hashes burn CPU at once.
+_password_executor = ThreadPoolExecutor(
+    max_workers=max(1, (os.cpu_count() or 2) // 2),
+    thread_name_prefix='password-hash'
+)
+
+# Argon2id with OWASP's 19 MiB / 2 pass / 1 lane profile, the same as bankingdb
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+def hash_password(password):
+    return _password_executor.submit(_password_hasher.hash, password).result()
+
+def _check_password(pwhash, password):
+    # Hashes stored before the switch to argon2 are werkzeug PBKDF2/scrypt ones
+    if not pwhash.startswith('$argon2'):
+        return check_password_hash(pwhash, password)
+    try:
+        return _password_hasher.verify(pwhash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def verify_password(pwhash, password):
+    return _password_executor.submit(_check_password, pwhash, password).result()
+
+# True for werkzeug hashes and argon2 hashes made with other parameters, so
+# login can upgrade them
+def password_needs_rehash(pwhash):
+    return not pwhash.startswith('$argon2') or _password_hasher.check_needs_rehash(pwhash)
+
+# Parsed once per distinct ID string; a ValueError is raised before anything
+# is cached, so malformed IDs never take up cache slots
+@lru_cache(maxsize=4096)
+def _parse_uuid_bytes(value):
+    return uuid.UUID(value).bytes
+
+def uuid_bytes(value):
+    """
+    Convert a UUID string from a request to the 16 bytes stored in BINARY(16) keys.
+
+    :param value: A UUID string, such as a pagination cursor.
+    :return: The UUID's 16-byte form; aborts with 400 if the string is not a UUID.
+    """
+    try:
+        return _parse_uuid_bytes(value)
+    except ValueError:
+        abort(400, message='Invalid UUID format')
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -139,11 +317,11 @@ class Account(db.Model):
     __tablename__ = 'account'
     
     account_id = db.Column(BINARY(16), primary_key=True, default=generate_uuid)
-    customer_id = db.Column(BINARY(16), db.ForeignKey('customer.customer_id', onupdate='CASCADE', ondelete='RESTRICT'), nullable=False)
+    customer_id = db.Column(BINARY(16), db.ForeignKey('customer.customer_id', onupdate='CASCADE', ondelete='RESTRICT'), nullable=False, index=True)
     account_type = db.Column(db.Enum('CHECKING', 'SAVINGS'), nullable=False)
     balance = db.Column(db.DECIMAL(15,2), nullable=False, default=0.00)
     creation_date = db.Column(db.DateTime, nullable=False)
-    branch_id = db.Column(BINARY(16), db.ForeignKey('branch.branch_id', onupdate='CASCADE', ondelete='RESTRICT'), nullable=False)
+    branch_id = db.Column(BINARY(16), db.ForeignKey('branch.branch_id', onupdate='CASCADE', ondelete='RESTRICT'), nullable=False, index=True)
 
     cards = db.relationship('Card', backref='account', cascade='all, delete-orphan')
     outgoing_transactions = db.relationship('Transaction', foreign_keys='Transaction.from_account_id', backref='from_account', cascade='all, delete-orphan')
@@ -174,6 +352,9 @@ class Loan(db.Model):
         db.CheckConstraint('principal_amount > 0', name='check_principal_positive'),
         db.CheckConstraint('interest_rate >= 0', name='check_interest_non_negative'),
         db.CheckConstraint('start_date < end_date', name='check_dates_valid'),
+        # At most one ACTIVE loan per customer, enforced by the database
+        db.Index('uq_loan_one_active_per_customer', 'customer_id', unique=True,
+                 sqlite_where=text("status = 'ACTIVE'")),
     )
     
     def __repr__(self):
@@ -200,7 +381,7 @@ class Employee(db.Model):
     __tablename__ = 'employee'
     
     employee_id = db.Column(BINARY(16), primary_key=True, default=generate_uuid)
-    branch_id = db.Column(BINARY(16), db.ForeignKey('branch.branch_id', onupdate='CASCADE', ondelete='RESTRICT'), nullable=False)
+    branch_id = db.Column(BINARY(16), db.ForeignKey('branch.branch_id', onupdate='CASCADE', ondelete='RESTRICT'), nullable=False, index=True)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
     position = db.Column(db.String(100), nullable=False)
@@ -239,6 +420,9 @@ class Transaction(db.Model):
 
     __table_args__ = (
         db.CheckConstraint('amount > 0', name='check_amount_positive'),
+        # An account's transactions on each side, in time order
+        db.Index('ix_transaction_from_account_time', 'from_account_id', 'transaction_timestamp'),
+        db.Index('ix_transaction_to_account_time', 'to_account_id', 'transaction_timestamp'),
     )
         
     def __repr__(self):
@@ -254,6 +438,11 @@ class CustomerSupport(db.Model):
     status = db.Column(db.Enum('OPEN', 'IN_PROGRESS', 'RESOLVED'), nullable=False)
     created_date = db.Column(db.DateTime, nullable=False)
     resolved_date = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Lets the top resolvers query read RESOLVED tickets as one index range
+        db.Index('ix_customer_support_status_employee', 'status', 'employee_id'),
+    )
         
     def __repr__(self):
         return f"CustomerSupport(ticket_id = {self.ticket_id}, customer_id = {self.customer_id}, employee_id = {self.employee_id}, issue_description = {self.issue_description}, status = {self.status}, created_date = {self.created_date}, resolved_date = {self.resolved_date})"
@@ -270,6 +459,13 @@ class CreditScore(db.Model):
     def __repr__(self):
         return f"CreditScore(credit_score_id = {self.credit_score_id}, customer_id = {self.customer_id}, score = {self.score}, risk_category = {self.risk_category}, computed_by_system = {self.computed_by_system})"
     
+# Validator patterns, compiled once at import
+ZIP_CODE_RE = re.compile(r'\d{5}(-\d{4})?')
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+CARD_NUMBER_RE = re.compile(r'\d{13,19}')
+CVV_RE = re.compile(r'\d{3}')
+PHONE_NUMBER_RE = re.compile(r'\+?[0-9\s\-()]{7,15}')
+
 def validate_uuid(value):
     try:
         uuid.UUID(hex=value)
@@ -278,19 +474,25 @@ def validate_uuid(value):
         raise ValueError('Invalid UUID format')
 
 def validate_date(date_string):
+    # Fast path for zero-padded YYYY-MM-DD; strptime still takes the
+    # unpadded forms it always accepted
+    if len(date_string) == 10 and date_string[4] == date_string[7] == '-':
+        try:
+            return datetime.fromisoformat(date_string)
+        except ValueError:
+            pass
     try:
         return datetime.strptime(date_string, '%Y-%m-%d')
     except ValueError:
         raise ValueError("Date must be in the format YYYY-MM-DD")
 
 def validate_zip_code(zip_code):
-    if re.fullmatch(r'^\d{5}(-\d{4})?$', zip_code):
+    if ZIP_CODE_RE.fullmatch(zip_code):
         return zip_code
     raise ValueError("ZIP code must be in the format 12345 or 12345-6789")
 
 def validate_email(email):
-    email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.fullmatch(email_regex, email):
+    if EMAIL_RE.fullmatch(email):
         return email
     raise ValueError("Invalid email address")
 
@@ -313,12 +515,12 @@ def validate_not_negative_number(value):
     return value
 
 def validate_card_number(card_number):
-    if not re.fullmatch(r'^\d{13,19}$', card_number):
+    if not CARD_NUMBER_RE.fullmatch(card_number):
         raise ValueError("Card number must be 13 to 19 digits long")
     return card_number
 
 def validate_cvv(cvv):
-    if not re.fullmatch(r'^\d{3}$', cvv):
+    if not CVV_RE.fullmatch(cvv):
         raise ValueError("CVV must be 3 or 4 digits")
     return cvv
 
@@ -336,14 +538,19 @@ def validate_datetime(datetime_str, format="%Y-%m-%d %H:%M:%S"):
     Raises:
         ValueError: If the input string doesn't match the format.
     """
+    # Fast path for the default format, which fromisoformat parses directly
+    if format == "%Y-%m-%d %H:%M:%S" and len(datetime_str) == 19 and datetime_str[4] == datetime_str[7] == '-' and datetime_str[10] == ' ':
+        try:
+            return datetime.fromisoformat(datetime_str)
+        except ValueError:
+            pass
     try:
         return datetime.strptime(datetime_str, format)
     except ValueError:
         raise ValueError(f"Invalid datetime. Expected format: {format}")
 
 def validate_phone_number(phone):
-    phone_regex = r'^\+?[0-9\s\-()]{7,15}$'
-    if not re.fullmatch(phone_regex, phone):
+    if not PHONE_NUMBER_RE.fullmatch(phone):
         raise ValueError("Invalid phone number format")
     return phone
 
@@ -446,126 +653,420 @@ loan_args.add_argument('start_date', type=validate_date, required=True, help='St
 loan_args.add_argument('end_date', type=validate_date, required=True, help='End date is required and should be in format YYYY-MM-DD')
 loan_args.add_argument('status', type=str, choices=('ACTIVE', 'PAID_OFF', 'DEFAULT'), required=True, help='Status is required and should be in "[ACTIVE, PAID_OFF, DEFAULT]"')
 
+def compile_parser(parser):
+    """
+    Flatten a RequestParser into a tuple of argument specs, once at import.
+
+    :param parser: A reqparse.RequestParser; arguments defined twice keep their first definition.
+    :return: A tuple of (name, type, required, choices, default, help) tuples.
+    """
+    spec = {}
+    for arg in parser.args:
+        spec.setdefault(arg.name, (arg.name, arg.type, arg.required, arg.choices, arg.default, arg.help))
+    return tuple(spec.values())
+
+def parse_body(spec, data=None):
+    """
+    Parse and validate the JSON body against a compiled argument spec.
+
+    :param spec: A tuple built by compile_parser.
+    :param data: One object of an array body; defaults to the request's JSON body.
+    :return: A dict of converted values; aborts with 400 the way reqparse does.
+    """
+    if data is None:
+        data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    elif not isinstance(data, dict):
+        abort(400, message='Request body must be a JSON object')
+
+    args = {}
+    for name, type_, required, choices, default, help in spec:
+        if name not in data:
+            if required:
+                abort(400, message={name: help or 'Missing required parameter in the JSON body'})
+            args[name] = default
+            continue
+
+        value = data[name]
+        if value is not None:
+            try:
+                value = type_(value)
+            except (TypeError, ValueError) as e:
+                abort(400, message={name: help.format(error_msg=e) if help else str(e)})
+            if choices and value not in choices:
+                abort(400, message={name: help or f'{value} is not a valid choice'})
+        args[name] = value
+    return args
+
+def delete_by_pk(model, pk):
+    """
+    Delete one row with a single DELETE statement instead of loading it first.
+
+    Only for models with no ORM cascades or child relationships to maintain.
+
+    :param model: The model class to delete from.
+    :param pk: The 16-byte primary key.
+    :return: The number of rows deleted (0 when the key does not exist).
+    """
+    primary_key = model.__mapper__.primary_key[0]
+    result = db.session.execute(delete(model).where(primary_key == pk))
+    db.session.commit()
+    forget_resource(model, pk)
+    forget_analytics(model)
+    return result.rowcount
+
+# Largest array body accepted by one POST
+MAX_BULK_ROWS = 1000
+
+def create_many(model, spec):
+    """
+    Insert every object of a JSON array body with one bulk INSERT and a single commit.
+
+    :param model: The model class to create.
+    :param spec: The compiled argument spec each object is validated against.
+    :return: {'inserted': count} with 201; aborts with 400 on invalid or duplicate rows.
+    """
+    items = request.get_json(silent=True)
+    if not items:
+        abort(400, message='Request body must be a non-empty JSON array')
+    if len(items) > MAX_BULK_ROWS:
+        abort(400, message=f'At most {MAX_BULK_ROWS} rows can be created per request')
+
+    # Validate everything before the first INSERT
+    objects = [model(**parse_body(spec, item)) for item in items]
+    db.session.bulk_save_objects(objects)
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        abort(400, message=str(e.orig))
+    forget_analytics(model)
+    return {'inserted': len(objects)}, 201
+
+# Write endpoints parse their bodies with these; the RequestParsers above
+# stay the single place the arguments are defined
+USER_ARGS = compile_parser(user_args)
+BRANCH_ARGS = compile_parser(branch_args)
+CUSTOMER_ARGS = compile_parser(customer_args)
+ACCOUNT_ARGS = compile_parser(account_args)
+LOAN_ARGS = compile_parser(loan_args)
+LOAN_PAYMENT_ARGS = compile_parser(loan_payment_args)
+EMPLOYEE_ARGS = compile_parser(employee_args)
+CARD_ARGS = compile_parser(card_args)
+TRANSACTION_ARGS = compile_parser(transaction_args)
+CUSTOMER_SUPPORT_ARGS = compile_parser(customer_support_args)
+CREDIT_SCORE_ARGS = compile_parser(credit_score_args)
+MONEY_TRANSFER_ARGS = compile_parser(money_transfer_args)
+
 
 user_fields = {
-    'user_id': fields.String,
-    'username': fields.String,
-    'password': fields.String,
-    'role': fields.String,
-    'customer_id': fields.String,
+    'user_id': fields.String(),
+    'username': fields.String(),
+    'password': fields.String(),
+    'role': fields.String(),
+    'customer_id': fields.String(),
 }
 
 branch_fields = {
-    'branch_id': fields.String,
-    'branch_name': fields.String,
-    'address_line1': fields.String,
-    'address_line2': fields.String,
-    'city': fields.String,
-    'zip_code': fields.String,
-    'phone_number': fields.String,
+    'branch_id': fields.String(),
+    'branch_name': fields.String(),
+    'address_line1': fields.String(),
+    'address_line2': fields.String(),
+    'city': fields.String(),
+    'zip_code': fields.String(),
+    'phone_number': fields.String(),
 }
 
 customer_fields = {
-    'customer_id': fields.String,
-    'first_name': fields.String,
-    'last_name': fields.String,
-    'date_of_birth': fields.String,
-    'phone_number': fields.String,
-    'email': fields.String,
-    'address_line1': fields.String,
-    'address_line2': fields.String,
-    'city': fields.String,
-    'zip_code': fields.String,
-    'wage_declaration': fields.String,
+    'customer_id': fields.String(),
+    'first_name': fields.String(),
+    'last_name': fields.String(),
+    'date_of_birth': fields.String(),
+    'phone_number': fields.String(),
+    'email': fields.String(),
+    'address_line1': fields.String(),
+    'address_line2': fields.String(),
+    'city': fields.String(),
+    'zip_code': fields.String(),
+    'wage_declaration': fields.String(),
 }
 
 account_fields = {
-    'account_id': fields.String,
-    'customer_id': fields.String,
-    'account_type': fields.String,
-    'balance': fields.Float,
-    'creation_date': fields.DateTime,
-    'branch_id': fields.String,
+    'account_id': fields.String(),
+    'customer_id': fields.String(),
+    'account_type': fields.String(),
+    'balance': fields.Float(),
+    'creation_date': fields.DateTime(),
+    'branch_id': fields.String(),
 }
 
 loan_fields = {
-    'loan_id': fields.String,
-    'customer_id': fields.String,
-    'loan_type': fields.String,
-    'principal_amount': fields.Float,
-    'interest_rate': fields.Float,
-    'start_date': fields.String,
-    'end_date': fields.String,
-    'status': fields.String,
+    'loan_id': fields.String(),
+    'customer_id': fields.String(),
+    'loan_type': fields.String(),
+    'principal_amount': fields.Float(),
+    'interest_rate': fields.Float(),
+    'start_date': fields.String(),
+    'end_date': fields.String(),
+    'status': fields.String(),
 }
 
 loan_payment_fields = {
-    'loan_payment_id': fields.String,
-    'loan_id': fields.String,
-    'payment_date': fields.String,
-    'payment_amount': fields.Float,
-    'remaining_balance': fields.Float,
+    'loan_payment_id': fields.String(),
+    'loan_id': fields.String(),
+    'payment_date': fields.String(),
+    'payment_amount': fields.Float(),
+    'remaining_balance': fields.Float(),
 }
 
 employee_fields = {
-    'employee_id': fields.String,
-    'branch_id': fields.String,
-    'first_name': fields.String,
-    'last_name': fields.String,
-    'position': fields.String,
-    'hire_date': fields.DateTime,
-    'phone_number': fields.String,
-    'email': fields.String,
+    'employee_id': fields.String(),
+    'branch_id': fields.String(),
+    'first_name': fields.String(),
+    'last_name': fields.String(),
+    'position': fields.String(),
+    'hire_date': fields.DateTime(),
+    'phone_number': fields.String(),
+    'email': fields.String(),
 }
 
 card_fields = {
-    'card_id': fields.String,
-    'account_id': fields.String,
-    'card_type': fields.String,
-    'card_number': fields.String,
-    'expiration_date': fields.String,
-    'cvv': fields.String,
-    'status': fields.String,
+    'card_id': fields.String(),
+    'account_id': fields.String(),
+    'card_type': fields.String(),
+    'card_number': fields.String(),
+    'expiration_date': fields.String(),
+    'cvv': fields.String(),
+    'status': fields.String(),
 }
 
 transaction_fields = {
-    'transaction_id': fields.String,
-    'from_account_id': fields.String,
-    'to_account_id': fields.String,
-    'transaction_type': fields.String,
-    'amount': fields.Float,
-    'transaction_timestamp': fields.DateTime,
+    'transaction_id': fields.String(),
+    'from_account_id': fields.String(),
+    'to_account_id': fields.String(),
+    'transaction_type': fields.String(),
+    'amount': fields.Float(),
+    'transaction_timestamp': fields.DateTime(),
 }
 
 customer_support_fields = {
-    'ticket_id': fields.String,
-    'customer_id': fields.String,
-    'employee_id': fields.String,
-    'issue_description': fields.String,
-    'status': fields.String,
-    'created_date': fields.DateTime,
-    'resolved_date': fields.DateTime,
+    'ticket_id': fields.String(),
+    'customer_id': fields.String(),
+    'employee_id': fields.String(),
+    'issue_description': fields.String(),
+    'status': fields.String(),
+    'created_date': fields.DateTime(),
+    'resolved_date': fields.DateTime(),
 }
 
 credit_score_fields = {
-    'credit_score_id': fields.String,
-    'customer_id': fields.String,
-    'score': fields.Float,
-    'risk_category': fields.String,
-    'computed_by_system': fields.Boolean,
+    'credit_score_id': fields.String(),
+    'customer_id': fields.String(),
+    'score': fields.Float(),
+    'risk_category': fields.String(),
+    'computed_by_system': fields.Boolean(),
 }
 
+def compile_marshaller(fields_dict):
+    """
+    Build a function that marshals one object with the given fields, for list endpoints.
+
+    :param fields_dict: A flask-restful fields dict such as user_fields.
+    :return: A function mapping an object to a dict with the same output as marshal().
+    """
+    formatters = tuple(fields_dict.items())
+
+    def marshaller(obj):
+        row = {}
+        for key, field in formatters:
+            value = getattr(obj, key, None)
+            row[key] = field.default if value is None else field.format(value)
+        return row
+
+    return marshaller
+
+def list_query(model, fields_dict):
+    """
+    Select only the columns a list endpoint marshals, as plain rows rather than ORM objects.
+
+    Rows expose the columns as attributes, so the compiled marshallers format them
+    unchanged, without the identity map and instrumented objects a Query builds.
+
+    :param model: The model class to list.
+    :param fields_dict: The fields dict the rows are marshalled with.
+    :return: A select() statement over those columns.
+    """
+    columns = [getattr(model, key) for key in fields_dict if key in model.__table__.columns]
+    return select(*columns)
+
+def list_page(model, fields_dict, marshaller, default_limit=50, max_limit=500):
+    """
+    Return one keyset page of a model's rows, ordered by primary key.
+
+    Reads ?limit= (capped at max_limit) and ?cursor= (the next_cursor of the previous page).
+
+    :param model: The model class to list.
+    :param fields_dict: The fields dict the rows are marshalled with.
+    :param marshaller: The compiled marshaller for fields_dict.
+    :return: {'items': [...], 'next_cursor': UUID string, or None on the last page}.
+    """
+    limit = request.args.get('limit', default=default_limit, type=int)
+    limit = max(1, min(limit, max_limit))
+    cursor = request.args.get('cursor')
+
+    primary_key = model.__mapper__.primary_key[0]
+    query = list_query(model, fields_dict)
+    if cursor:
+        query = query.where(primary_key > uuid_bytes(cursor))
+
+    items = []
+    last = None
+    for row in db.session.execute(query.order_by(primary_key).limit(limit)):
+        items.append(marshaller(row))
+        last = row
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = str(uuid.UUID(bytes=getattr(last, primary_key.key)))
+    return {'items': items, 'next_cursor': next_cursor}
+
+# List endpoints format rows with these instead of marshal_with
+USER_MARSHAL = compile_marshaller(user_fields)
+BRANCH_MARSHAL = compile_marshaller(branch_fields)
+CUSTOMER_MARSHAL = compile_marshaller(customer_fields)
+ACCOUNT_MARSHAL = compile_marshaller(account_fields)
+LOAN_MARSHAL = compile_marshaller(loan_fields)
+LOAN_PAYMENT_MARSHAL = compile_marshaller(loan_payment_fields)
+EMPLOYEE_MARSHAL = compile_marshaller(employee_fields)
+CARD_MARSHAL = compile_marshaller(card_fields)
+TRANSACTION_MARSHAL = compile_marshaller(transaction_fields)
+CUSTOMER_SUPPORT_MARSHAL = compile_marshaller(customer_support_fields)
+CREDIT_SCORE_MARSHAL = compile_marshaller(credit_score_fields)
+
+def ttl_cache(ttl, maxsize=128):
+    """
+    Memoize a function of hashable arguments for ttl seconds, in this process.
+
+    The wrapped function gets a cache_clear() for writers that make its results stale.
+
+    :param ttl: Seconds a result is served before the function runs again.
+    :param maxsize: Entries kept before the cache is emptied.
+    :return: The decorator.
+    """
+    def decorator(fn):
+        entries = {}
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            entry = entries.get(args)
+            if entry and entry[0] > now:
+                return entry[1]
+            result = fn(*args)
+            with lock:
+                if len(entries) >= maxsize:
+                    entries.clear()
+                entries[args] = (now + ttl, result)
+            return result
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+# ResourceCache instances by model, so generic writers such as delete_by_pk
+# can drop the rows they change
+RESOURCE_CACHES = {}
+
+def forget_resource(model, pk):
+    cache = RESOURCE_CACHES.get(model)
+    if cache is not None:
+        cache.forget(pk)
+
+class ResourceCache:
+    """
+    Per-process LRU of marshalled single-row GET bodies and their ETags, keyed by primary key.
+
+    Each model gets its own instance so sizes and invalidation stay independent;
+    the resource's PUT and DELETE call forget() once the row has changed, and the
+    TTL bounds how stale another worker process's copy can be.
+    """
+    def __init__(self, model, marshaller, not_found, ttl=60, maxsize=10000):
+        self.model = model
+        self.marshaller = marshaller
+        self.not_found = not_found
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        RESOURCE_CACHES[model] = self
+
+    def forget(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def get(self, pk):
+        """
+        Serve the row from the cache, loading and marshalling it on a miss.
+
+        :param pk: The 16-byte primary key.
+        :return: (body, 200, headers) or a 304 response when the client's If-None-Match matches.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is not None:
+                self._entries.move_to_end(pk)
+
+        if entry is None or entry[0] <= now:
+            obj = db.session.get(self.model, pk)
+            if not obj:
+                abort(404, message=self.not_found)
+            body = self.marshaller(obj)
+            etag = hashlib.blake2b(orjson.dumps(body, default=str), digest_size=16).hexdigest()
+            entry = (now + self.ttl, body, etag)
+            with self._lock:
+                self._entries[pk] = entry
+                self._entries.move_to_end(pk)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+        _, body, etag = entry
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        return body, 200, {'ETag': f'"{etag}"'}
+
+USER_CACHE = ResourceCache(User, USER_MARSHAL, 'User not found')
+BRANCH_CACHE = ResourceCache(Branch, BRANCH_MARSHAL, 'Branch not found')
+LOAN_CACHE = ResourceCache(Loan, LOAN_MARSHAL, 'Loan not found')
+CUSTOMER_CACHE = ResourceCache(Customer, CUSTOMER_MARSHAL, 'Customer not found')
+ACCOUNT_CACHE = ResourceCache(Account, ACCOUNT_MARSHAL, 'Account not found')
+LOAN_PAYMENT_CACHE = ResourceCache(LoanPayment, LOAN_PAYMENT_MARSHAL, 'Loan payment not found')
+EMPLOYEE_CACHE = ResourceCache(Employee, EMPLOYEE_MARSHAL, 'Employee not found')
+CARD_CACHE = ResourceCache(Card, CARD_MARSHAL, 'Card not found')
+TRANSACTION_CACHE = ResourceCache(Transaction, TRANSACTION_MARSHAL, 'Transaction not found')
+CUSTOMER_SUPPORT_CACHE = ResourceCache(CustomerSupport, CUSTOMER_SUPPORT_MARSHAL, 'Customer support ticket not found')
+CREDIT_SCORE_CACHE = ResourceCache(CreditScore, CREDIT_SCORE_MARSHAL, 'Credit score not found')
+
 class UserResourceAll(Resource):
-    @marshal_with(user_fields)
     @admin_required
     def get(self):
-        branch = User.query.all()
-        return branch
+        return list_page(User, user_fields, USER_MARSHAL)
 
-    @marshal_with(user_fields)
     @admin_required
     def post(self):
-        args = user_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(User, USER_ARGS)
+
+        args = parse_body(USER_ARGS)
         user = User(
             username=args['username'], 
             password=args['password'], 
@@ -574,23 +1075,18 @@ class UserResourceAll(Resource):
         )
         db.session.add(user)
         db.session.commit()
-        users = User.query.all()
-        return users, 201
+        return marshal(user, user_fields), 201
 
 class UserResource(Resource):
-    @marshal_with(user_fields)
     @admin_required
     def get(self, user_id):
-        user = User.query.filter_by(user_id=uuid.UUID(user_id).bytes).first()
-        if not user:
-            abort(404, message='User not found')
-        return user
+        return USER_CACHE.get(user_id)
     
     @marshal_with(user_fields)
     @admin_required
     def put(self, user_id):
-        args = user_args.parse_args()
-        user = User.query.filter_by(user_id=uuid.UUID(user_id).bytes).first()
+        args = parse_body(USER_ARGS)
+        user = db.session.get(User, user_id)
         if not user:
             abort(404, message='User not found')
         user.username = args['username']
@@ -598,80 +1094,71 @@ class UserResource(Resource):
         user.role = args['role']
         user.customer_id = args['customer_id']
         db.session.commit()
+        forget_cached_user(user.user_id)
+        USER_CACHE.forget(user_id)
         return user
     
     @admin_required
     def delete(self, user_id):
-        user = User.query.filter_by(user_id=uuid.UUID(user_id).bytes).first()
-        if not user:
+        if not delete_by_pk(User, user_id):
             abort(404, message='User not found')
-        db.session.delete(user)
-        db.session.commit()
-        return {'message': f'User {user_id} deleted successfully'}, 200
+        forget_cached_user(user_id)
+        return {'message': f'User {uuid.UUID(bytes=user_id)} deleted successfully'}, 200
 
 class BranchResourceAll(Resource):
-    @marshal_with(branch_fields)
+    @admin_required
+    def get(self):
+        return list_page(Branch, branch_fields, BRANCH_MARSHAL)
+
     @admin_required
     def post(self):
-        args = branch_args.parse_args()
-
-        # Validate required fields
-        missing_fields = [field for field in ['branch_name', 'address_line1', 'city', 'zip_code', 'phone_number'] if not args.get(field)]
-        if missing_fields:
-            return jsonify({
-                'error': f"Missing required fields: {', '.join(missing_fields)}"
-            }), 400
-
-        # Check for duplicate branch name or phone number
-        existing_branch = Branch.query.filter(
-            (Branch.branch_name == args['branch_name']) |
-            (Branch.phone_number == args['phone_number'])
-        ).first()
-
-        if existing_branch:
-            message = []
-            if existing_branch.branch_name == args['branch_name']:
-                message.append(f"Branch name '{args['branch_name']}' already exists.")
-            if existing_branch.phone_number == args['phone_number']:
-                message.append(f"Phone number '{args['phone_number']}' already exists.")
-            return jsonify({'error': ' '.join(message)}), 400
-
-        # Try to create the new branch
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Branch, BRANCH_ARGS)
+
+        args = parse_body(BRANCH_ARGS)
+
+        # The UNIQUE indexes on branch_name and phone_number catch duplicates
+        # in the INSERT itself, which also holds under concurrent requests
+        branch = Branch(
+            branch_name=args['branch_name'],
+            address_line1=args['address_line1'],
+            address_line2=args.get('address_line2'),
+            city=args['city'],
+            zip_code=args['zip_code'],
+            phone_number=args['phone_number']
+        )
+        db.session.add(branch)
         try:
-            branch = Branch(
-                branch_name=args['branch_name'],
-                address_line1=args['address_line1'],
-                address_line2=args.get('address_line2'),
-                city=args['city'],
-                zip_code=args['zip_code'],
-                phone_number=args['phone_number']
-            )
-            db.session.add(branch)
             db.session.commit()
+            forget_analytics(Branch)
+        except IntegrityError as e:
+            db.session.rollback()
+            violation = str(e.orig)
+            if 'branch_name' in violation:
+                abort(400, message=f"Branch name '{args['branch_name']}' already exists.")
+            if 'phone_number' in violation:
+                abort(400, message=f"Phone number '{args['phone_number']}' already exists.")
+            abort(500, message=f"Failed to create branch: {violation}")
         except Exception as e:
             db.session.rollback()
-            return jsonify({'error': f"Failed to create branch: {str(e)}"}), 500
+            abort(500, message=f"Failed to create branch: {str(e)}")
 
-        # Return all branches on success
-        branches = Branch.query.all()
-        return branches, 201
+        # Return the created branch on success
+        return marshal(branch, branch_fields), 201
 
 
 
 class BranchResource(Resource):
-    @marshal_with(branch_fields)
     @admin_required
     def get(self, branch_id):
-        branch = Branch.query.filter_by(branch_id=uuid.UUID(branch_id).bytes).first()
-        if not branch:
-            abort(404, message='Branch not found')
-        return branch
+        return BRANCH_CACHE.get(branch_id)
 
     @marshal_with(branch_fields)
     @admin_required
     def put(self, branch_id):
-        args = branch_args.parse_args()
-        branch = Branch.query.filter_by(branch_id=uuid.UUID(branch_id).bytes).first()
+        args = parse_body(BRANCH_ARGS)
+        branch = db.session.get(Branch, branch_id)
         if not branch:
             abort(404, message='Branch not found')
 
@@ -683,29 +1170,32 @@ class BranchResource(Resource):
         branch.zip_code = args['zip_code']
         branch.phone_number = args['phone_number']
         db.session.commit()
+        forget_analytics(Branch)
+        BRANCH_CACHE.forget(branch_id)
         return branch
 
     @admin_required
     def delete(self, branch_id):
-        branch = Branch.query.filter_by(branch_id=uuid.UUID(branch_id).bytes).first()
+        branch = db.session.get(Branch, branch_id)
         if not branch:
             abort(404, message='Branch not found')
         db.session.delete(branch)
         db.session.commit()
-        return {'message': f'Branch {branch_id} deleted successfully'}, 200
+        return {'message': f'Branch {uuid.UUID(bytes=branch_id)} deleted successfully'}, 200
 
 
 class CustomerResourceAll(Resource):
-    @marshal_with(customer_fields)
     @admin_required
     def get(self):
-        customers = Customer.query.all()
-        return customers
+        return list_page(Customer, customer_fields, CUSTOMER_MARSHAL)
     
-    @marshal_with(customer_fields)
     @admin_required
     def post(self):
-        args = customer_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Customer, CUSTOMER_ARGS)
+
+        args = parse_body(CUSTOMER_ARGS)
         customer = Customer(
             first_name=args['first_name'], 
             last_name=args['last_name'], 
@@ -720,26 +1210,21 @@ class CustomerResourceAll(Resource):
         )
         db.session.add(customer)
         db.session.commit()
-        customers = Customer.query.all()
-        return customers, 201
+        return marshal(customer, customer_fields), 201
 
 class CustomerResource(Resource):
-    @marshal_with(customer_fields)
     @user_or_admin_required
     def get(self, customer_id):
-        claims = get_jwt()
-        if claims['role'] == 'USER' and claims['customer_id'] != customer_id:
-            return {'error': 'Access denied'}, 403
-        customer = Customer.query.filter_by(customer_id=customer_id).first()
-        if not customer:
-            abort(404, message='Customer not found')
-        return customer
+        claims = g.jwt_claims
+        if claims['role'] == 'USER' and claims['customer_id'] != customer_id.hex():
+            abort(403, message='Access denied')
+        return CUSTOMER_CACHE.get(customer_id)
     
     @marshal_with(customer_fields)
     @admin_required
     def put(self, customer_id):
-        args = customer_args.parse_args()
-        customer = Customer.query.filter_by(customer_id=uuid.UUID(customer_id).bytes).first()
+        args = parse_body(CUSTOMER_ARGS)
+        customer = db.session.get(Customer, customer_id)
         if not customer:
             abort(404, message='Customer not found')
         customer.first_name = args['first_name']
@@ -753,28 +1238,32 @@ class CustomerResource(Resource):
         customer.zip_code = args['zip_code']
         customer.wage_declaration = args['wage_declaration']
         db.session.commit()
+        CUSTOMER_CACHE.forget(customer_id)
         return customer
     
     @admin_required
     def delete(self, customer_id):
-        customer = Customer.query.filter_by(customer_id=uuid.UUID(customer_id).bytes).first()
+        customer = db.session.get(Customer, customer_id)
         if not customer:
             abort(404, message='Customer not found')
+        # The ORM cascade deletes the customer's accounts, loans, tickets and
+        # credit score too; forget_deleted_rows evicts all of them
         db.session.delete(customer)
         db.session.commit()
-        return {'message': f'Customer {customer_id} deleted successfully'}, 200
+        return {'message': f'Customer {uuid.UUID(bytes=customer_id)} deleted successfully'}, 200
 
 class AccountResourceAll(Resource):
-    @marshal_with(account_fields)
     @admin_required
     def get(self):
-        accounts = Account.query.all()
-        return accounts
+        return list_page(Account, account_fields, ACCOUNT_MARSHAL)
     
-    @marshal_with(account_fields)
     @admin_required
     def post(self):
-        args = account_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Account, ACCOUNT_ARGS)
+
+        args = parse_body(ACCOUNT_ARGS)
         account = Account(
             customer_id=args['customer_id'], 
             account_type=args['account_type'], 
@@ -784,23 +1273,19 @@ class AccountResourceAll(Resource):
         )
         db.session.add(account)
         db.session.commit()
-        accounts = Account.query.all()
-        return accounts, 201
+        forget_analytics(Account)
+        return marshal(account, account_fields), 201
 
 class AccountResource(Resource):
-    @marshal_with(account_fields)
     @admin_required
     def get(self, account_id):
-        account = Account.query.filter_by(account_id=uuid.UUID(account_id).bytes).first()
-        if not account:
-            abort(404, message='Account not found')
-        return account
+        return ACCOUNT_CACHE.get(account_id)
     
     @marshal_with(account_fields)
     @admin_required
     def put(self, account_id):
-        args = account_args.parse_args()
-        account = Account.query.filter_by(account_id=uuid.UUID(account_id).bytes).first()
+        args = parse_body(ACCOUNT_ARGS)
+        account = db.session.get(Account, account_id)
         if not account:
             abort(404, message='Account not found')
         account.customer_id = args['customer_id']
@@ -809,28 +1294,47 @@ class AccountResource(Resource):
         account.creation_date = args['creation_date']
         account.branch_id = args['branch_id']
         db.session.commit()
+        ACCOUNT_CACHE.forget(account_id)
+        forget_analytics(Account)
         return account
     
     @admin_required
     def delete(self, account_id):
-        account = Account.query.filter_by(account_id=uuid.UUID(account_id).bytes).first()
+        account = db.session.get(Account, account_id)
         if not account:
             abort(404, message='Account not found')
         db.session.delete(account)
         db.session.commit()
-        return {'message': f'Account {account_id} deleted successfully'}, 200
+        return {'message': f'Account {uuid.UUID(bytes=account_id)} deleted successfully'}, 200
+
+def commit_loan():
+    """
+    Commit a created or updated loan, turning constraint violations into 400s.
+
+    uq_loan_one_active_per_customer rejects a second ACTIVE loan for the same
+    customer, as in take_loan.
+    """
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        violation = str(e.orig)
+        if 'loan.customer_id' in violation:
+            abort(400, message='Customer already has an active loan')
+        abort(400, message=violation)
 
 class LoanResourceAll(Resource):
-    @marshal_with(loan_fields)
     @admin_required
     def get(self):
-        loans = Loan.query.all()
-        return loans
+        return list_page(Loan, loan_fields, LOAN_MARSHAL)
     
-    @marshal_with(loan_fields)
     @admin_required
     def post(self):
-        args = loan_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Loan, LOAN_ARGS)
+
+        args = parse_body(LOAN_ARGS)
         loan = Loan(
             customer_id=args['customer_id'], 
             loan_type=args['loan_type'], 
@@ -841,24 +1345,19 @@ class LoanResourceAll(Resource):
             status=args['status']
         )
         db.session.add(loan)
-        db.session.commit()
-        loans = Loan.query.all()
-        return loans, 201
+        commit_loan()
+        return marshal(loan, loan_fields), 201
     
 class LoanResource(Resource):
-    @marshal_with(loan_fields)
     @admin_required
     def get(self, loan_id):
-        loan = Loan.query.filter_by(loan_id=uuid.UUID(loan_id).bytes).first()
-        if not loan:
-            abort(404, message='Loan not found')
-        return loan
+        return LOAN_CACHE.get(loan_id)
     
     @marshal_with(loan_fields)
     @admin_required
     def put(self, loan_id):
-        args = loan_args.parse_args()
-        loan = Loan.query.filter_by(loan_id=uuid.UUID(loan_id).bytes).first()
+        args = parse_body(LOAN_ARGS)
+        loan = db.session.get(Loan, loan_id)
         if not loan:
             abort(404, message='Loan not found')
         loan.customer_id = args['customer_id']
@@ -868,29 +1367,31 @@ class LoanResource(Resource):
         loan.start_date = args['start_date']
         loan.end_date = args['end_date']
         loan.status = args['status']
-        db.session.commit()
+        commit_loan()
+        LOAN_CACHE.forget(loan_id)
         return loan
     
     @admin_required
     def delete(self, loan_id):
-        loan = Loan.query.filter_by(loan_id=uuid.UUID(loan_id).bytes).first()
+        loan = db.session.get(Loan, loan_id)
         if not loan:
             abort(404, message='Loan not found')
         db.session.delete(loan)
         db.session.commit()
-        return {'message': f'Loan {loan_id} deleted successfully'}, 200
+        return {'message': f'Loan {uuid.UUID(bytes=loan_id)} deleted successfully'}, 200
 
 class LoanPaymentResourceAll(Resource):
-    @marshal_with(loan_payment_fields)
     @admin_required
     def get(self):
-        loan_payments = LoanPayment.query.all()
-        return loan_payments
+        return list_page(LoanPayment, loan_payment_fields, LOAN_PAYMENT_MARSHAL)
     
-    @marshal_with(loan_payment_fields)
     @admin_required
     def post(self):
-        args = loan_payment_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(LoanPayment, LOAN_PAYMENT_ARGS)
+
+        args = parse_body(LOAN_PAYMENT_ARGS)
         loan_payment = LoanPayment(
             loan_id=args['loan_id'], 
             payment_date=args['payment_date'], 
@@ -899,23 +1400,18 @@ class LoanPaymentResourceAll(Resource):
         )
         db.session.add(loan_payment)
         db.session.commit()
-        loan_payments = LoanPayment.query.all()
-        return loan_payments, 201
+        return marshal(loan_payment, loan_payment_fields), 201
     
 class LoanPaymentResource(Resource):
-    @marshal_with(loan_payment_fields)
     @admin_required
     def get(self, loan_payment_id):
-        loan_payment = LoanPayment.query.filter_by(loan_payment_id=uuid.UUID(loan_payment_id).bytes).first()
-        if not loan_payment:
-            abort(404, message='Loan payment not found')
-        return loan_payment
+        return LOAN_PAYMENT_CACHE.get(loan_payment_id)
     
     @marshal_with(loan_payment_fields)
     @admin_required
     def put(self, loan_payment_id):
-        args = loan_payment_args.parse_args()
-        loan_payment = LoanPayment.query.filter_by(loan_payment_id=uuid.UUID(loan_payment_id).bytes).first()
+        args = parse_body(LOAN_PAYMENT_ARGS)
+        loan_payment = db.session.get(LoanPayment, loan_payment_id)
         if not loan_payment:
             abort(404, message='Loan payment not found')
         loan_payment.loan_id = args['loan_id']
@@ -923,28 +1419,27 @@ class LoanPaymentResource(Resource):
         loan_payment.payment_amount = args['payment_amount']
         loan_payment.remaining_balance = args['remaining_balance']
         db.session.commit()
+        LOAN_PAYMENT_CACHE.forget(loan_payment_id)
         return loan_payment
     
     @admin_required
     def delete(self, loan_payment_id):
-        loan_payment = LoanPayment.query.filter_by(loan_payment_id=uuid.UUID(loan_payment_id).bytes).first()
-        if not loan_payment:
+        if not delete_by_pk(LoanPayment, loan_payment_id):
             abort(404, message='Loan payment not found')
-        db.session.delete(loan_payment)
-        db.session.commit()
-        return {'message': f'Loan payment {loan_payment_id} deleted successfully'}, 200
+        return {'message': f'Loan payment {uuid.UUID(bytes=loan_payment_id)} deleted successfully'}, 200
     
 class EmployeeResourceAll(Resource):
-    @marshal_with(employee_fields)
     @admin_required
     def get(self):
-        employees = Employee.query.all()
-        return employees
+        return list_page(Employee, employee_fields, EMPLOYEE_MARSHAL)
     
-    @marshal_with(employee_fields)
     @admin_required
     def post(self):
-        args = employee_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Employee, EMPLOYEE_ARGS)
+
+        args = parse_body(EMPLOYEE_ARGS)
         employee = Employee(
             branch_id=args['branch_id'], 
             first_name=args['first_name'], 
@@ -956,23 +1451,19 @@ class EmployeeResourceAll(Resource):
         )
         db.session.add(employee)
         db.session.commit()
-        employees = Employee.query.all()
-        return employees, 201
+        forget_analytics(Employee)
+        return marshal(employee, employee_fields), 201
 
 class EmployeeResource(Resource):
-    @marshal_with(employee_fields)
     @admin_required
     def get(self, employee_id):
-        employee = Employee.query.filter_by(employee_id=uuid.UUID(employee_id).bytes).first()
-        if not employee:
-            abort(404, message='Employee not found')
-        return employee
+        return EMPLOYEE_CACHE.get(employee_id)
     
     @marshal_with(employee_fields)
     @admin_required
     def put(self, employee_id):
-        args = employee_args.parse_args()
-        employee = Employee.query.filter_by(employee_id=uuid.UUID(employee_id).bytes).first()
+        args = parse_body(EMPLOYEE_ARGS)
+        employee = db.session.get(Employee, employee_id)
         if not employee:
             abort(404, message='Employee not found')
         employee.branch_id = args['branch_id']
@@ -983,27 +1474,30 @@ class EmployeeResource(Resource):
         employee.phone_number = args['phone_number']
         employee.email = args['email']
         db.session.commit()
+        EMPLOYEE_CACHE.forget(employee_id)
+        forget_analytics(Employee)
         return employee
     
     @admin_required
     def delete(self, employee_id):
-        employee = Employee.query.filter_by(employee_id=uuid.UUID(employee_id).bytes).first()
+        employee = db.session.get(Employee, employee_id)
         if not employee:
             abort(404, message='Employee not found')
         db.session.delete(employee)
         db.session.commit()
-        return {'message': f'Employee {employee_id} deleted successfully'}, 200
+        return {'message': f'Employee {uuid.UUID(bytes=employee_id)} deleted successfully'}, 200
     
 class CardResourceAll(Resource):
-    @marshal_with(card_fields)
     @admin_required
     def get(self):
-        cards = Card.query.all()
-        return cards
+        return list_page(Card, card_fields, CARD_MARSHAL)
     
-    @marshal_with(card_fields)
     def post(self):
-        args = card_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Card, CARD_ARGS)
+
+        args = parse_body(CARD_ARGS)
         card = Card(
             account_id=args['account_id'], 
             card_type=args['card_type'], 
@@ -1014,23 +1508,18 @@ class CardResourceAll(Resource):
         )
         db.session.add(card)
         db.session.commit()
-        cards = Card.query.all()
-        return cards, 201
+        return marshal(card, card_fields), 201
     
 class CardResource(Resource):
-    @marshal_with(card_fields)
     @admin_required
     def get(self, card_id):
-        card = Card.query.filter_by(card_id=uuid.UUID(card_id).bytes).first()
-        if not card:
-            abort(404, message='Card not found')
-        return card
+        return CARD_CACHE.get(card_id)
     
     @marshal_with(card_fields)
     @admin_required
     def put(self, card_id):
-        args = card_args.parse_args()
-        card = Card.query.filter_by(card_id=uuid.UUID(card_id).bytes).first()
+        args = parse_body(CARD_ARGS)
+        card = db.session.get(Card, card_id)
         if not card:
             abort(404, message='Card not found')
         card.account_id = args['account_id']
@@ -1040,28 +1529,27 @@ class CardResource(Resource):
         card.cvv = args['cvv']
         card.status = args['status']
         db.session.commit()
+        CARD_CACHE.forget(card_id)
         return card
     
     @admin_required
     def delete(self, card_id):
-        card = Card.query.filter_by(card_id=uuid.UUID(card_id).bytes).first()
-        if not card:
+        if not delete_by_pk(Card, card_id):
             abort(404, message='Card not found')
-        db.session.delete(card)
-        db.session.commit()
-        return {'message': f'Card {card_id} deleted successfully'}, 200
+        return {'message': f'Card {uuid.UUID(bytes=card_id)} deleted successfully'}, 200
     
 class TransactionResourceAll(Resource):
-    @marshal_with(transaction_fields)
     @admin_required
     def get(self):
-        transactions = Transaction.query.all()
-        return transactions
+        return list_page(Transaction, transaction_fields, TRANSACTION_MARSHAL)
     
-    @marshal_with(transaction_fields)
     @admin_required
     def post(self):
-        args = transaction_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(Transaction, TRANSACTION_ARGS)
+
+        args = parse_body(TRANSACTION_ARGS)
         transaction = Transaction(
             from_account_id=args['from_account_id'], 
             to_account_id=args['to_account_id'], 
@@ -1071,23 +1559,18 @@ class TransactionResourceAll(Resource):
         )
         db.session.add(transaction)
         db.session.commit()
-        transactions = Transaction.query.all()
-        return transactions, 201
+        return marshal(transaction, transaction_fields), 201
     
 class TransactionResource(Resource):
-    @marshal_with(transaction_fields)
     @admin_required
     def get(self, transaction_id):
-        transaction = Transaction.query.filter_by(transaction_id=uuid.UUID(transaction_id).bytes).first()
-        if not transaction:
-            abort(404, message='Transaction not found')
-        return transaction
+        return TRANSACTION_CACHE.get(transaction_id)
     
     @marshal_with(transaction_fields)
     @admin_required
     def put(self, transaction_id):
-        args = transaction_args.parse_args()
-        transaction = Transaction.query.filter_by(transaction_id=uuid.UUID(transaction_id).bytes).first()
+        args = parse_body(TRANSACTION_ARGS)
+        transaction = db.session.get(Transaction, transaction_id)
         if not transaction:
             abort(404, message='Transaction not found')
         transaction.from_account_id = args['from_account_id']
@@ -1096,28 +1579,27 @@ class TransactionResource(Resource):
         transaction.amount = args['amount']
         transaction.transaction_timestamp = args['transaction_timestamp']
         db.session.commit()
+        TRANSACTION_CACHE.forget(transaction_id)
         return transaction
     
     @admin_required
     def delete(self, transaction_id):
-        transaction = Transaction.query.filter_by(transaction_id=uuid.UUID(transaction_id).bytes).first()
-        if not transaction:
+        if not delete_by_pk(Transaction, transaction_id):
             abort(404, message='Transaction not found')
-        db.session.delete(transaction)
-        db.session.commit()
-        return {'message': f'Transaction {transaction_id} deleted successfully'}, 200
+        return {'message': f'Transaction {uuid.UUID(bytes=transaction_id)} deleted successfully'}, 200
     
 class CustomerSupportResourceAll(Resource):
-    @marshal_with(customer_support_fields)
     @admin_required
     def get(self):
-        customer_supports = CustomerSupport.query.all()
-        return customer_supports
+        return list_page(CustomerSupport, customer_support_fields, CUSTOMER_SUPPORT_MARSHAL)
     
-    @marshal_with(customer_support_fields)
     @admin_required
     def post(self):
-        args = customer_support_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(CustomerSupport, CUSTOMER_SUPPORT_ARGS)
+
+        args = parse_body(CUSTOMER_SUPPORT_ARGS)
         customer_support = CustomerSupport(
             customer_id=args['customer_id'], 
             employee_id=args['employee_id'], 
@@ -1128,23 +1610,19 @@ class CustomerSupportResourceAll(Resource):
         )
         db.session.add(customer_support)
         db.session.commit()
-        customer_supports = CustomerSupport.query.all()
-        return customer_supports, 201
+        forget_analytics(CustomerSupport)
+        return marshal(customer_support, customer_support_fields), 201
     
 class CustomerSupportResource(Resource):
-    @marshal_with(customer_support_fields)
     @admin_required
     def get(self, ticket_id):
-        customer_support = CustomerSupport.query.filter_by(ticket_id=uuid.UUID(ticket_id).bytes).first()
-        if not customer_support:
-            abort(404, message='Customer support ticket not found')
-        return customer_support
+        return CUSTOMER_SUPPORT_CACHE.get(ticket_id)
     
     @marshal_with(customer_support_fields)
     @admin_required
     def put(self, ticket_id):
-        args = customer_support_args.parse_args()
-        customer_support = CustomerSupport.query.filter_by(ticket_id=uuid.UUID(ticket_id).bytes).first()
+        args = parse_body(CUSTOMER_SUPPORT_ARGS)
+        customer_support = db.session.get(CustomerSupport, ticket_id)
         if not customer_support:
             abort(404, message='Customer support ticket not found')
         customer_support.customer_id = args['customer_id']
@@ -1154,28 +1632,28 @@ class CustomerSupportResource(Resource):
         customer_support.created_date = args['created_date']
         customer_support.resolved_date = args['resolved_date']
         db.session.commit()
+        CUSTOMER_SUPPORT_CACHE.forget(ticket_id)
+        forget_analytics(CustomerSupport)
         return customer_support
     
     @admin_required
     def delete(self, ticket_id):
-        customer_support = CustomerSupport.query.filter_by(ticket_id=uuid.UUID(ticket_id).bytes).first()
-        if not customer_support:
+        if not delete_by_pk(CustomerSupport, ticket_id):
             abort(404, message='Customer support ticket not found')
-        db.session.delete(customer_support)
-        db.session.commit()
-        return {'message': f'Customer support ticket {ticket_id} deleted successfully'}, 200
+        return {'message': f'Customer support ticket {uuid.UUID(bytes=ticket_id)} deleted successfully'}, 200
     
 class CreditScoreResourceAll(Resource):
-    @marshal_with(credit_score_fields)
     @admin_required
     def get(self):
-        credit_scores = CreditScore.query.all()
-        return credit_scores
+        return list_page(CreditScore, credit_score_fields, CREDIT_SCORE_MARSHAL)
     
-    @marshal_with(credit_score_fields)
     @admin_required
     def post(self):
-        args = credit_score_args.parse_args()
+        # An array body creates many rows at once
+        if isinstance(request.get_json(silent=True), list):
+            return create_many(CreditScore, CREDIT_SCORE_ARGS)
+
+        args = parse_body(CREDIT_SCORE_ARGS)
         credit_score = CreditScore(
             customer_id=args['customer_id'], 
             score=args['score'], 
@@ -1184,23 +1662,18 @@ class CreditScoreResourceAll(Resource):
         )
         db.session.add(credit_score)
         db.session.commit()
-        credit_scores = CreditScore.query.all()
-        return credit_scores, 201
+        return marshal(credit_score, credit_score_fields), 201
     
 class CreditScoreResource(Resource):
-    @marshal_with(credit_score_fields)
     @admin_required
     def get(self, credit_score_id):
-        credit_score = CreditScore.query.filter_by(credit_score_id=uuid.UUID(credit_score_id).bytes).first()
-        if not credit_score:
-            abort(404, message='Credit score not found')
-        return credit_score
+        return CREDIT_SCORE_CACHE.get(credit_score_id)
     
     @marshal_with(credit_score_fields)
     @admin_required
     def put(self, credit_score_id):
-        args = credit_score_args.parse_args()
-        credit_score = CreditScore.query.filter_by(credit_score_id=uuid.UUID(credit_score_id).bytes).first()
+        args = parse_body(CREDIT_SCORE_ARGS)
+        credit_score = db.session.get(CreditScore, credit_score_id)
         if not credit_score:
             abort(404, message='Credit score not found')
         credit_score.customer_id = args['customer_id']
@@ -1208,45 +1681,90 @@ class CreditScoreResource(Resource):
         credit_score.risk_category = args['risk_category']
         credit_score.computed_by_system = args['computed_by_system']
         db.session.commit()
+        CREDIT_SCORE_CACHE.forget(credit_score_id)
         return credit_score
     
     @admin_required
     def delete(self, credit_score_id):
-        credit_score = CreditScore.query.filter_by(credit_score_id=uuid.UUID(credit_score_id).bytes).first()
-        if not credit_score:
+        if not delete_by_pk(CreditScore, credit_score_id):
             abort(404, message='Credit score not found')
-        db.session.delete(credit_score)
-        db.session.commit()
-        return {'message': f'Credit score {credit_score_id} deleted successfully'}, 200
+        return {'message': f'Credit score {uuid.UUID(bytes=credit_score_id)} deleted successfully'}, 200
     
 resources = [
     (UserResourceAll, '/api/user/'),
-    (UserResource, '/api/user/<uuid:user_id>'),
+    (UserResource, '/api/user/<uuidb:user_id>'),
     (BranchResourceAll, '/api/branch/'),
-    (BranchResource, '/api/branch/<uuid:branch_id>'),
+    (BranchResource, '/api/branch/<uuidb:branch_id>'),
     (CustomerResourceAll, '/api/customer/'),
-    (CustomerResource, '/api/customer/<uuid:customer_id>'),
+    (CustomerResource, '/api/customer/<uuidb:customer_id>'),
     (AccountResourceAll, '/api/account/'),
-    (AccountResource, '/api/account/<uuid:account_id>'),
+    (AccountResource, '/api/account/<uuidb:account_id>'),
     (LoanResourceAll, '/api/loan/'),
-    (LoanResource, '/api/loan/<uuid:loan_id>'),
+    (LoanResource, '/api/loan/<uuidb:loan_id>'),
     (LoanPaymentResourceAll, '/api/loanpayment/'),
-    (LoanPaymentResource, '/api/loanpayment/<uuid:loan_payment_id>'),
+    (LoanPaymentResource, '/api/loanpayment/<uuidb:loan_payment_id>'),
     (EmployeeResourceAll, '/api/employee/'),
-    (EmployeeResource, '/api/employee/<uuid:employee_id>'),
+    (EmployeeResource, '/api/employee/<uuidb:employee_id>'),
     (CardResourceAll, '/api/card/'),
-    (CardResource, '/api/card/<uuid:card_id>'),
+    (CardResource, '/api/card/<uuidb:card_id>'),
     (TransactionResourceAll, '/api/transaction/'),
-    (TransactionResource, '/api/transaction/<uuid:transaction_id>'),
+    (TransactionResource, '/api/transaction/<uuidb:transaction_id>'),
     (CustomerSupportResourceAll, '/api/customersupport/'),
-    (CustomerSupportResource, '/api/customersupport/<uuid:ticket_id>'),
+    (CustomerSupportResource, '/api/customersupport/<uuidb:ticket_id>'),
     (CreditScoreResourceAll, '/api/creditscore/'),
-    (CreditScoreResource, '/api/creditscore/<uuid:credit_score_id>')
+    (CreditScoreResource, '/api/creditscore/<uuidb:credit_score_id>')
 ]
 
 for resource, route in resources:
     api.add_resource(resource, route)
 
+# Analytics queries, built once at import; SQLAlchemy's compiled cache then
+# reuses their compiled form across requests
+# Employees and accounts are counted separately per branch and then joined,
+# so a branch's rows are never multiplied together before counting
+BRANCHES_WITH_CONDITIONS_SQL = text("""
+    SELECT B.branch_name,
+       COALESCE(E.cnt, 0) AS employee_count,
+       COALESCE(A.cnt, 0) AS account_count
+        FROM branch B
+        LEFT JOIN (SELECT branch_id, COUNT(*) AS cnt FROM employee GROUP BY branch_id) E
+            ON B.branch_id = E.branch_id
+        LEFT JOIN (SELECT branch_id, COUNT(*) AS cnt FROM account GROUP BY branch_id) A
+            ON B.branch_id = A.branch_id
+        WHERE COALESCE(E.cnt, 0) > :min_employees AND COALESCE(A.cnt, 0) >= :min_accounts;
+""").bindparams(bindparam('min_employees', type_=Integer), bindparam('min_accounts', type_=Integer))
+
+# The sending and receiving sides are matched separately so each join can use
+# its foreign key index; a transfer between the same account counts once
+HIGH_TRANSACTION_CUSTOMERS_SQL = text("""
+    WITH TX AS (
+        SELECT from_account_id AS account_id, amount FROM `transaction`
+        UNION ALL
+        SELECT to_account_id, amount FROM `transaction` WHERE to_account_id <> from_account_id
+    )
+    SELECT C.customer_id, C.first_name, C.last_name, SUM(TX.amount) AS total_transaction
+    FROM customer C
+    JOIN account A ON C.customer_id = A.customer_id
+    JOIN TX ON A.account_id = TX.account_id
+    GROUP BY C.customer_id, C.first_name, C.last_name
+    HAVING SUM(TX.amount) > :min_transaction_total;
+""").bindparams(bindparam('min_transaction_total', type_=Numeric))
+
+# RANK() finds the top count in the same pass that groups the tickets
+TOP_RESOLVERS_SQL = text("""
+    SELECT employee_id, first_name, last_name, resolved_tickets
+    FROM (
+        SELECT E.employee_id, E.first_name, E.last_name, COUNT(*) AS resolved_tickets,
+               RANK() OVER (ORDER BY COUNT(*) DESC) AS resolver_rank
+        FROM employee E
+        JOIN customer_support CS ON E.employee_id = CS.employee_id
+        WHERE CS.status = 'RESOLVED'
+        GROUP BY E.employee_id, E.first_name, E.last_name
+    ) RankedResolvers
+    WHERE resolver_rank = 1;
+""")
+
+@ttl_cache(ttl=120)
 def get_branches_with_conditions(min_employees=5, min_accounts=3):
     """
     Fetch branches with a minimum number of employees and accounts.
@@ -1255,18 +1773,8 @@ def get_branches_with_conditions(min_employees=5, min_accounts=3):
     :param min_accounts: Minimum number of accounts required (default is 3).
     :return: List of dictionaries containing branch names, employee counts, and account counts.
     """
-    query = text("""
-    SELECT B.branch_name, 
-       COUNT(DISTINCT E.employee_id) AS employee_count, 
-       COUNT(DISTINCT A.account_id) AS account_count 
-        FROM branch B 
-        LEFT JOIN employee E ON B.branch_id = E.branch_id 
-        LEFT JOIN account A ON B.branch_id = A.branch_id 
-        GROUP BY B.branch_name
-        HAVING employee_count > :min_employees AND account_count >= :min_accounts;
-    """)
-    results = db.session.execute(query, {'min_employees': min_employees, 'min_accounts': min_accounts}).fetchall()
-    return [dict(row) for row in results]
+    results = db.session.execute(BRANCHES_WITH_CONDITIONS_SQL, {'min_employees': min_employees, 'min_accounts': min_accounts})
+    return [dict(row) for row in results.mappings()]
 
 @app.route('/api/branches', methods=['GET'])
 @admin_required
@@ -1296,16 +1804,8 @@ def get_customers_with_high_transactions(min_transaction_total):
     :param min_transaction_total: Minimum transaction total required (default is $10,000).
     :return: List of dictionaries containing customer details and total transaction amounts.
     """
-    query = text("""
-    SELECT C.customer_id, C.first_name, C.last_name, SUM(T.amount) AS total_transaction
-    FROM customer C
-    JOIN account A ON C.customer_id = A.customer_id
-    JOIN "transaction" T ON A.account_id = T.from_account_id OR A.account_id = T.to_account_id
-    GROUP BY C.customer_id, C.first_name, C.last_name
-    HAVING SUM(T.amount) > :min_transaction_total;
-    """)
-    results = db.session.execute(query, {'min_transaction_total': min_transaction_total}).fetchall()
-    return [dict(row) for row in results]
+    results = db.session.execute(HIGH_TRANSACTION_CUSTOMERS_SQL, {'min_transaction_total': min_transaction_total})
+    return [dict(row) for row in results.mappings()]
 
 @app.route('/api/customer/high-transactions', methods=['GET'])
 @admin_required
@@ -1319,27 +1819,54 @@ def api_customers_high_transactions():
         return jsonify({'message': 'No customers found with transactions exceeding the specified amount.'}), 404
     return jsonify(results)
 
+@ttl_cache(ttl=120)
+def get_top_resolvers():
+    """
+    Fetch the employees who resolved the most customer support tickets.
+
+    :return: List of dictionaries containing employee details and resolved ticket counts.
+    """
+    results = db.session.execute(TOP_RESOLVERS_SQL)
+    return [dict(row) for row in results.mappings()]
+
+# Aggregates cached above, by the models whose writes make them stale
+ANALYTICS_CACHES = {
+    Branch: (get_branches_with_conditions,),
+    Customer: (get_branches_with_conditions, get_top_resolvers),
+    Account: (get_branches_with_conditions,),
+    Employee: (get_branches_with_conditions, get_top_resolvers),
+    CustomerSupport: (get_top_resolvers,),
+}
+
+def forget_analytics(model):
+    for cached in ANALYTICS_CACHES.get(model, ()):
+        cached.cache_clear()
+
+# session.delete() cascades to children the endpoints never load, such as a
+# customer's accounts and their cards and transactions. Every deleted row is
+# recorded at flush and evicted from the caches once the delete commits.
+@event.listens_for(db.session, 'persistent_to_deleted')
+def remember_deleted_row(session, instance):
+    session.info.setdefault('deleted_rows', []).append(
+        (type(instance), inspect(instance).identity[0]))
+
+@event.listens_for(db.session, 'after_commit')
+def forget_deleted_rows(session):
+    for model, pk in session.info.pop('deleted_rows', ()):
+        forget_resource(model, pk)
+        forget_analytics(model)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_deleted_rows(session):
+    session.info.pop('deleted_rows', None)
+
 @app.route('/api/employee/top-resolvers', methods=['GET'])
 @admin_required
 def api_employees_top_resolvers():
-    query = text("""
-    WITH ResolvedTickets AS (
-        SELECT E.employee_id, E.first_name, E.last_name, COUNT(CS.ticket_id) AS resolved_tickets
-        FROM employee E
-        JOIN customer_support CS ON E.employee_id = CS.employee_id
-        WHERE CS.status = 'RESOLVED'
-        GROUP BY E.employee_id, E.first_name, E.last_name
-    )
-    SELECT employee_id, first_name, last_name, resolved_tickets
-    FROM ResolvedTickets
-    WHERE resolved_tickets = (
-        SELECT MAX(resolved_tickets) FROM ResolvedTickets
-    );
-    """)
-    results = db.session.execute(query).fetchall()
+    results = get_top_resolvers()
     if not results:
         return jsonify({'message': 'No employees found with with meeting criteria.'}), 404
-    return jsonify([dict(row) for row in results])
+    return jsonify(results)
 
 @app.route('/')
 def home():
@@ -1373,20 +1900,8 @@ def register():
     if not (username and password and first_name and last_name and date_of_birth and phone_number and email and address_line1 and city and zip_code):
         return jsonify({'error': 'Missing required fields'}), 400
 
-    # Check if username already exists
-    if User.query.filter_by(username=username).first():
-        return jsonify({'error': 'Username already exists. Please choose another.'}), 400
-
-    # Check if email already exists
-    if Customer.query.filter_by(email=email).first():
-        return jsonify({'error': 'Email already exists. Please use another email.'}), 400
-
-    # Check if phone_number already exists
-    if Customer.query.filter_by(phone_number=phone_number).first():
-        return jsonify({'error': 'Phone number already exists. Please use another phone number.'}), 400
-
     # Hash the password
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
 
     # Generate UUID for customer_id
     customer_id = generate_uuid()
@@ -1416,10 +1931,21 @@ def register():
     )
     db.session.add(new_user)
 
-    # Commit transaction
+    # Commit transaction; the unique constraints on username, email and
+    # phone_number reject duplicates, even between concurrent registrations
     try:
         db.session.commit()
         return jsonify({'message': 'User and customer registered successfully'}), 201
+    except IntegrityError as e:
+        db.session.rollback()
+        violation = str(e.orig)
+        if 'user.username' in violation:
+            return jsonify({'error': 'Username already exists. Please choose another.'}), 400
+        if 'customer.email' in violation:
+            return jsonify({'error': 'Email already exists. Please use another email.'}), 400
+        if 'customer.phone_number' in violation:
+            return jsonify({'error': 'Phone number already exists. Please use another phone number.'}), 400
+        return jsonify({'error': violation}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'An error occurred during registration. Please try again.'}), 500
@@ -1431,7 +1957,7 @@ def register():
 def login():
 
     try:
-        args = user_args.parse_args()
+        args = parse_body(USER_ARGS)
         username = args['username']
         password = args['password']
     except Exception as e:
@@ -1443,9 +1969,16 @@ def login():
         return jsonify({'error': 'User does not exist'}), 401
 
     # Check password validity
-    if not check_password_hash(user.password, password):
+    if not verify_password(user.password, password):
         return jsonify({'error': 'Invalid password'}), 401
 
+    # Upgrade legacy hashes while the plaintext is at hand
+    if password_needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.session.commit()
+        forget_cached_user(user.user_id)
+        USER_CACHE.forget(user.user_id)
+
     # Prepare additional claims for the JWT
     additional_claims = {
         "username": user.username,
@@ -1463,8 +1996,22 @@ def login():
     return jsonify({'access_token': access_token}), 200
 
 
+# Debit the sender and credit the receiver in one statement. Ownership and
+# balance are checked inside the same write, so no other transfer can spend
+# the same money between the check and the debit. Two rows change on success
+# and none otherwise.
+TRANSFER_SQL = text("""
+    UPDATE account
+    SET balance = balance + CASE WHEN account_id = :sender THEN -:amount ELSE :amount END
+    WHERE account_id IN (:sender, :receiver) AND :sender <> :receiver
+      AND EXISTS (
+        SELECT 1 FROM account
+        WHERE account_id = :sender AND customer_id = :customer AND balance >= :amount
+      )
+""")
+
 @app.route('/api/money-transfer', methods=['POST'])
-@jwt_required
+@jwt_required()
 def money_transfer():
     identity = get_jwt()
     
@@ -1472,43 +2019,49 @@ def money_transfer():
         return jsonify({'error': 'customer_id is None'}), 404
 
     sender_customer_id = uuid.UUID(hex=identity['customer_id']).bytes
-    sender_customer = Customer.query.filter_by(customer_id=sender_customer_id).one_or_none()
-    if not sender_customer:
-        return jsonify({'error': 'No customer exists with this customer_id'}), 404
     
-    args = money_transfer_args.parse_args()
+    args = parse_body(MONEY_TRANSFER_ARGS)
     sender_account_id = args['sender_account_id']
     receiver_account_id = args['receiver_account_id']
     amount = args['amount']
-
-    sender_account = Account.query.filter_by(account_id=uuid.UUID(hex=sender_account_id).bytes).one_or_none()
-    if not sender_account:
-        return jsonify({'error': 'No account exists with this account_id sender'}), 404
-    
-    if sender_account.customer_id != sender_customer_id:
-        return jsonify({'error': 'Access denied: This account is not connected with claimed customer_id'}), 403
-
-    receiver_account = Account.query.filter_by(account_id=uuid.UUID(hex=receiver_account_id).bytes).one_or_none()
-    if not receiver_account:
-        return jsonify({'error': 'No account exists with this account_id receiver'}), 404
-
-    if sender_account.balance < amount:
-        return jsonify({'error': 'Insufficient balance'})
-    
-    sender_account.balance -= amount
-    receiver_account.balance += amount
+    sender_id = uuid.UUID(hex=sender_account_id).bytes
+    receiver_id = uuid.UUID(hex=receiver_account_id).bytes
+
+    result = db.session.execute(TRANSFER_SQL, {
+        'sender': sender_id,
+        'receiver': receiver_id,
+        'customer': sender_customer_id,
+        'amount': amount
+    })
+    if result.rowcount != 2:
+        db.session.rollback()
+        # Only a failed transfer pays for the lookups that explain why
+        if not db.session.get(Customer, sender_customer_id):
+            return jsonify({'error': 'No customer exists with this customer_id'}), 404
+        sender_account = db.session.get(Account, sender_id)
+        if not sender_account:
+            return jsonify({'error': 'No account exists with this account_id sender'}), 404
+        if sender_account.customer_id != sender_customer_id:
+            return jsonify({'error': 'Access denied: This account is not connected with claimed customer_id'}), 403
+        if not db.session.get(Account, receiver_id):
+            return jsonify({'error': 'No account exists with this account_id receiver'}), 404
+        if sender_id == receiver_id:
+            return jsonify({'error': 'Sender and receiver accounts must differ'}), 400
+        return jsonify({'error': 'Insufficient balance'}), 400
 
     transaction_timestamp=datetime.now()
     
     new_transaction = Transaction(
-        from_account_id=uuid.UUID(hex=sender_account_id).bytes,
-        to_account_id=uuid.UUID(hex=receiver_account_id).bytes,
+        from_account_id=sender_id,
+        to_account_id=receiver_id,
         transaction_type='TRANSFER',
         amount=amount,
         transaction_timestamp=transaction_timestamp
     )
     db.session.add(new_transaction)
     db.session.commit()
+    ACCOUNT_CACHE.forget(sender_id)
+    ACCOUNT_CACHE.forget(receiver_id)
 
     return jsonify({
         'message': f'Money transfer is successfull',
@@ -1516,7 +2069,8 @@ def money_transfer():
         'receiver_account_id': receiver_account_id,
         'transaction_type': 'TRANSFER',
         'amount': amount,
-        'transaction_timestamp': transaction_timestamp
+        # orjson would send ISO 8601; keep the HTTP-date Flask's json sent before
+        'transaction_timestamp': http_date(transaction_timestamp)
     }), 201
 
 @app.route('/api/take-loan', methods=['POST'])
@@ -1528,17 +2082,13 @@ def take_loan():
     if not customer_id_hex:
         return jsonify({'error': 'Customer ID not found for the user'}), 403
 
-    args = loan_args.parse_args()
+    args = parse_body(LOAN_ARGS)
 
     customer_id = uuid.UUID(hex=customer_id_hex).bytes
-    customer = Customer.query.filter_by(customer_id=customer_id).one_or_none()
+    customer = db.session.get(Customer, customer_id)
     if not customer:
         return jsonify({'error': 'Customer not found'}), 404
 
-    existing_loans = Loan.query.filter_by(customer_id=customer_id, status='ACTIVE').count()
-    if existing_loans >= 1: 
-        return jsonify({'error': 'Customer already has an active loan'}), 400
-
     # Create a new loan
     loan = Loan(
         customer_id=customer_id,
@@ -1550,7 +2100,15 @@ def take_loan():
         status='ACTIVE'
     )
     db.session.add(loan)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        violation = str(e.orig)
+        # uq_loan_one_active_per_customer rejects a second active loan
+        if 'loan.customer_id' in violation:
+            return jsonify({'error': 'Customer already has an active loan'}), 400
+        return jsonify({'error': violation}), 400
 
     return jsonify({
         'message': 'Loan created successfully',
@@ -1566,5 +2124,6 @@ def take_loan():
     }), 201
 
 
+# Development server only; production runs under gunicorn with gunicorn.conf.py
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
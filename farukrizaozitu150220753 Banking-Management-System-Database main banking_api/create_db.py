@@ -1,4 +1,15 @@
 from api import app, db
+from sqlalchemy import text
 
 with app.app_context():
-    db.create_all()
\ No newline at end of file
+    db.create_all()
+    # create_all skips tables that already exist, so indexes declared on them
+    # later are created here. Run this once per deploy; the loan index fails
+    # if a customer already has two ACTIVE loans, which must be resolved first.
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    # The (account, transaction_timestamp) indexes cover these single-column ones
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX IF EXISTS ix_transaction_from_account_id'))
+        connection.execute(text('DROP INDEX IF EXISTS ix_transaction_to_account_id'))
@@ -0,0 +1,17 @@
+# Production server settings, picked up by running `gunicorn api:app` from
+# this directory. `python api.py` starts Flask's debug server, for
+# development only.
+import multiprocessing
+
+bind = '0.0.0.0:8000'
+
+# Threaded workers: sqlite3 and argon2 both release the GIL while they work,
+# so a request waiting on the database or hashing a password leaves the
+# worker's other threads serving. The handlers and SQLAlchemy session are
+# synchronous, so an ASGI server with async workers would gain nothing here.
+worker_class = 'gthread'
+workers = multiprocessing.cpu_count()
+
+# Keep threads at or below SQLALCHEMY_ENGINE_OPTIONS['pool_size'] so no
+# thread waits on a connection
+threads = 16